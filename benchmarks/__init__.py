@@ -0,0 +1,3 @@
+"""
+JSON to ReqIF Converter - benchmarks
+"""
@@ -0,0 +1,89 @@
+"""
+Deep hierarchy benchmark: synthetic single-chain document through every entry point
+
+    python -m benchmarks.deep [depth] [mapping.json]
+
+Extraction of the tree built in memory is timed and its level numbering checked. The document is then
+written to a temporary file and converted by convertFile, by the command line with and without --stream
+and by convert returning the xml string, every output must hold the whole chain of SPEC-HIERARCHY entries.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from json2reqif import convert, convertFile, loadMapping
+from json2reqif.converter import ReqIFConverterLib
+
+
+def deepDocument(depth: int) -> dict:
+    """Builds document where every folder holds exactly one child, last node is a leaf"""
+    root = {"Caption": "Deep Specification", "UID": "SPEC-0", "Id": "0", "children": []}
+    parent = root
+    for i in range(1, depth + 1):
+        node = {"SectionNumber": str(i), "Caption": f"Level {i}", "Content": f"<p>Level {i}</p>",
+                "UID": f"REQ-{i}", "Id": str(i), "children": []}
+        parent["children"].append(node)
+        parent = node
+    return root
+
+def checkOutput(name: str, xml: str, depth: int, elapsed: float) -> None:
+    """Every level has its own SPEC-HIERARCHY, all of them closed"""
+    opened, closed = xml.count("<SPEC-HIERARCHY "), xml.count("</SPEC-HIERARCHY>")
+    assert opened == closed == depth, f"{name}: expected {depth} hierarchy entries, got {opened} opened and {closed} closed"
+    print(f"{name:<16} {elapsed:.3f}s, {depth / elapsed:,.0f} nodes/s")
+
+def main():
+    depth        = int(len(sys.argv) > 1 and sys.argv[1] or 10000)
+    mapping_path = len(sys.argv) > 2 and sys.argv[2] or "sample/mapping_capella.json"
+
+    plan = loadMapping(mapping_path)
+    converter = ReqIFConverterLib(deepDocument(depth), plan)
+
+    start = time.perf_counter()
+    converter.extract_objects()
+    elapsed = time.perf_counter() - start
+
+    ### Walk the chain back and check level numbering
+    hierarchy, level = converter.hierarchy_data, 0
+    while hierarchy:
+        assert len(hierarchy) == 1 and hierarchy[0].level == level + 1, f"Broken level at {level + 1}"
+        hierarchy, level = hierarchy[0].children, level + 1
+    assert level == depth, f"Expected {depth} levels, got {level}"
+
+    print(f"{'extract':<16} {elapsed:.3f}s, {depth / elapsed:,.0f} nodes/s")
+
+    start = time.perf_counter()
+    checkOutput("string output", convert(deepDocument(depth), plan), depth, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as folder:
+        input_path = os.path.join(folder, "deep.json")
+        output = os.path.join(folder, "deep.reqif")
+
+        # Encoder recurses per level, the converter must read the file without help
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 4 * depth + 100))
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(deepDocument(depth)))
+        sys.setrecursionlimit(limit)
+
+        def read() -> str:
+            with open(output, "r", encoding="utf-8") as f:
+                return f.read()
+
+        start = time.perf_counter()
+        convertFile(input_path, plan, output)
+        checkOutput("convertFile", read(), depth, time.perf_counter() - start)
+
+        for name, options in (("cli", []), ("cli --stream", ["--stream"])):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-m", "json2reqif", input_path, output, mapping_path, "--quiet", *options],
+                                    capture_output=True, text=True)
+            assert result.returncode == 0, f"{name} failed:\n{result.stdout}{result.stderr}"
+            checkOutput(name, read(), depth, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
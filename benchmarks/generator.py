@@ -0,0 +1,147 @@
+"""
+Synthetic requirement tree generator
+
+    python -m benchmarks.generator output.json [--seed N] [--breadth N[,N...]] [--depth N] [--folders F]
+                                                [--kinds NAME:WEIGHT,...] [--xhtml CHARS] [--tables F] [--images F] [--image-size BYTES]
+
+Nodes follow the layout of sample/req_in.json, so sample mappings apply, and carry a Kind drawn from the kinds
+mix. Sample mappings pick variants by children count, benchmarks/mapping_kinds.json picks them by Kind for the
+default kinds, so the mix decides which variant converts a node. Breadth is the number of children
+of every folder, or one number per level. Below the top level a child is a folder with probability `folders`
+until the depth is reached, the last level holds leaves only. Same seed and shape always give the same document.
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+_WORDS = ("shall must system interface signal state mode sensor brake torque "
+          "voltage limit timeout fault monitor the of with within when").split()
+
+
+class Shape(NamedTuple):
+    breadth: Tuple[int, ...] = (10, 10, 10)
+    folders: float = 1.0
+    kinds: Tuple[Tuple[str, int], ...] = (("Requirement", 3), ("Function", 1), ("Capability", 1))
+    xhtml: int = 400
+    tables: float = 0.0
+    images: float = 0.0
+    image_size: int = 4096
+    seed: int = 1
+
+
+def _sentence(rand: random.Random, words: int) -> str:
+    return " ".join(rand.choices(_WORDS, k=words))
+
+def _richText(rand: random.Random, shape: Shape) -> str:
+    """Paragraphs and lists of about `xhtml` characters, with optional table and image"""
+    parts: List[str] = []
+    size = 0
+    while size < shape.xhtml:
+        kind = rand.random()
+        if kind < 0.6:
+            part = f"<p align=left>{_sentence(rand, 24)}</p>"
+        elif kind < 0.8:
+            part = f"<ul><li>{_sentence(rand, 8)}</li><li><strike>{_sentence(rand, 6)}</strike></li></ul>"
+        else:
+            part = f"<p><span lang=en>{_sentence(rand, 12)}</span> <b>{_sentence(rand, 3)}</b></p>"
+        parts.append(part)
+        size += len(part)
+
+    if rand.random() < shape.tables:
+        rows = "".join(f"<tr id=r{row}><td width=50>{_sentence(rand, 3)}</td><td>{_sentence(rand, 6)}</td></tr>" for row in range(4))
+        parts.append(f"<table><thead><tr><th>Item</th><th>Value</th></tr></thead><tbody>{rows}</tbody></table>")
+
+    if rand.random() < shape.images:
+        payload = base64.b64encode(rand.randbytes(shape.image_size)).decode("ascii")
+        parts.append(f'<p><img alt="figure" src="data:image/png;base64,{payload}"></p>')
+
+    return "".join(parts)
+
+def generateDocument(shape: Shape) -> Dict[str, Any]:
+    """Builds requirement tree, children are generated with explicit stack so any depth works"""
+    rand = random.Random(shape.seed)
+    names = [name for name, _ in shape.kinds]
+    weights = [weight for _, weight in shape.kinds]
+    depth = len(shape.breadth)
+
+    root = {"Caption": "Synthetic Specification", "UID": "SPEC-0", "Id": "0", "DocumentVersion": "1.0",
+            "URL": "https://example.com/spec", "children": []}
+    counter = 0
+
+    # Pending folders as (node, level, section number)
+    stack: List[Tuple[Dict[str, Any], int, str]] = [(root, 0, "")]
+    while stack:
+        parent, level, number = stack.pop()
+        folders: List[Tuple[Dict[str, Any], int, str]] = []
+        for index in range(1, shape.breadth[level] + 1):
+            counter += 1
+            section = f"{number}.{index}" if number else str(index)
+            is_folder = level + 1 < depth and (level == 0 or rand.random() < shape.folders)
+            node = {
+                "SectionNumber": section,
+                "Caption":       f"{'Section' if is_folder else 'Requirement'} {section}",
+                "Content":       _richText(rand, shape),
+                "UID":           f"REQ-{counter}",
+                "Id":            str(counter),
+                "Kind":          rand.choices(names, weights)[0],
+                "children":      [],
+            }
+            parent["children"].append(node)
+            if is_folder:
+                folders.append((node, level + 1, section))
+        stack.extend(reversed(folders))
+
+    return root
+
+def countNodes(document: Dict[str, Any]) -> int:
+    count = 0
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get("children", []))
+    return count
+
+def parseShape(argv: List[str]) -> Tuple[Shape, List[str]]:
+    """Shape from generator options, unknown options are left to the caller"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--breadth", default="10,10,10")
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--folders", type=float, default=1.0)
+    parser.add_argument("--kinds", default="Requirement:3,Function:1,Capability:1")
+    parser.add_argument("--xhtml", type=int, default=400)
+    parser.add_argument("--tables", type=float, default=0.0)
+    parser.add_argument("--images", type=float, default=0.0)
+    parser.add_argument("--image-size", type=int, default=4096)
+    args, rest = parser.parse_known_args(argv)
+
+    breadth = tuple(int(value) for value in args.breadth.split(","))
+    if args.depth is not None:
+        breadth = (breadth + (breadth[-1],) * args.depth)[:args.depth]
+
+    kinds = tuple((name, int(weight or 1)) for name, _, weight in (kind.partition(":") for kind in args.kinds.split(",")))
+    shape = Shape(breadth, args.folders, kinds, args.xhtml, args.tables, args.images, args.image_size, args.seed)
+    return shape, rest
+
+def main():
+    shape, rest = parseShape(sys.argv[1:])
+    if len(rest) != 1:
+        print(__doc__.strip())
+        sys.exit(2)
+
+    document = generateDocument(shape)
+
+    # Encoder recurses per level, deep chains are meant for --stream which reads them iteratively
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * len(shape.breadth) + 100))
+    with open(rest[0], "w", encoding="utf-8") as f:
+        f.write(json.dumps(document))
+
+    print(f"{countNodes(document):,} nodes written to {rest[0]}")
+
+if __name__ == "__main__":
+    main()
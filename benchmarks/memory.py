@@ -0,0 +1,64 @@
+"""
+Memory benchmark: peak resident size converting a large synthetic document
+
+    python -m benchmarks.memory [sections] [per_section] [mapping.json]
+
+Document of `sections` folders with `per_section` rich text requirements each is written to a temporary
+file, then converted in a fresh interpreter for every entry point, so peak RSS of one run does not hide
+the next. "tree" converts json loaded by the caller, "file" lets the converter load and release it,
+"stream" reads the input incrementally.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import Shape, countNodes, generateDocument
+
+_RUN = """
+import json, resource, sys
+from json2reqif import convert, convertFile, convertStream, loadMapping
+entry, input_path, mapping_path, output = sys.argv[1:]
+plan = loadMapping(mapping_path, cache=False)
+if entry == "tree":
+    convert(json.load(open(input_path, encoding="utf-8")), plan, output)
+elif entry == "file":
+    convertFile(input_path, plan, output)
+else:
+    convertStream(input_path, plan, output)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def main():
+    sections     = int(len(sys.argv) > 1 and sys.argv[1] or 2000)
+    per_section  = int(len(sys.argv) > 2 and sys.argv[2] or 50)
+    mapping_path = len(sys.argv) > 3 and sys.argv[3] or "sample/mapping_capella.json"
+
+    with tempfile.TemporaryDirectory() as folder:
+        input_path = os.path.join(folder, "wide.json")
+        document = generateDocument(Shape(breadth=(sections, per_section), xhtml=300))
+        nodes = countNodes(document)
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(document))
+        del document
+        print(f"{nodes:,} nodes, {os.path.getsize(input_path) / 2**20:.1f} MB input")
+
+        print(f"{'entry':<8} {'peak RSS':>10} {'time':>9}")
+        for entry in ("tree", "file", "stream"):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", _RUN, entry, input_path, mapping_path, os.path.join(folder, "out.reqif")],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            elapsed = time.perf_counter() - start
+            if result.returncode:
+                print(f"{entry:<8} {'failed':>10}")
+                continue
+            # ru_maxrss is kilobytes on Linux, bytes on macOS
+            peak = int(result.stdout.split()[-1]) / (2**20 if sys.platform == "darwin" else 2**10)
+            print(f"{entry:<8} {peak:>7.0f} MB {elapsed:>8.1f}s")
+
+if __name__ == "__main__":
+    main()
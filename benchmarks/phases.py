@@ -0,0 +1,184 @@
+"""
+Conversion phase benchmark on synthetic or given document, with JSON results for comparison between commits
+
+    python -m benchmarks.phases [--input input.json | generator options] [--mapping mapping.json] [--jobs N]
+                                [--repeat N] [--output results.json] [--compare previous.json]
+
+Without input the document is generated, see benchmarks.generator for its options (default 10x10x10),
+and converted with benchmarks/mapping_kinds.json unless mapping is given, so the kinds mix takes effect.
+Given input is converted with sample/mapping_capella.json by default.
+Every repeat runs in a fresh interpreter and times mapping load, json load, extract_objects,
+buildSpecifications, unparse into memory and write of the output. Median time and throughput of every
+phase are reported with the highest peak RSS, --compare prints the change against earlier results.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.generator import countNodes, generateDocument, parseShape
+
+PHASES = ("mapping", "load", "extract", "specifications", "assemble", "unparse", "write")
+
+
+def _timed(timings: Dict[str, float], name: str, function: Callable) -> Callable:
+    """Wraps function to add its duration to the phase"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+def runPhases(input_path: str, mapping_path: str, output: str, jobs: int) -> Dict[str, Any]:
+    """Converts input once, returns seconds of every phase, node count and peak RSS in MiB"""
+    from json2reqif import loadMapping
+    from json2reqif.converter import ReqIFConverterLib
+    from json2reqif.helpers.reqif_writer import ReqIFStreamWriter
+
+    timings: Dict[str, float] = {}
+    with contextlib.redirect_stderr(io.StringIO()):
+        plan = _timed(timings, "mapping", loadMapping)(mapping_path, cache=False)
+
+        def load() -> Any:
+            with open(input_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        converter = ReqIFConverterLib(_timed(timings, "load", load)(), plan, jobs=jobs)
+        converter.extract_objects = _timed(timings, "extract", converter.extract_objects)
+        converter.buildSpecifications = _timed(timings, "specifications", converter.buildSpecifications)
+
+        start = time.perf_counter()
+        bundle = converter.createBundle()
+        timings["assemble"] = time.perf_counter() - start - timings["extract"] - timings["specifications"]
+
+        def unparse() -> str:
+            buffer = io.StringIO()
+            ReqIFStreamWriter(buffer, converter.xhtml_cache.payloads).write(bundle)
+            return buffer.getvalue()
+
+        text = _timed(timings, "unparse", unparse)()
+
+        def write() -> None:
+            with open(output, "w", encoding="UTF-8") as f:
+                f.write(text)
+
+        _timed(timings, "write", write)()
+
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    return {"phases": timings, "objects": len(converter.all_objects), "peak_rss_mb": round(peak, 1)}
+
+def summarize(runs: List[Dict[str, Any]], nodes: int) -> Dict[str, Any]:
+    """Median seconds and nodes/s per phase and in total, highest peak RSS"""
+    phases: Dict[str, Dict[str, float]] = {}
+    for name in (*PHASES, "total"):
+        seconds = statistics.median(sum(run["phases"].values()) if name == "total" else run["phases"][name] for run in runs)
+        phases[name] = {"seconds": round(seconds, 4), "nodes_per_s": round(nodes / seconds, 1) if seconds else None}
+    return {"phases": phases, "peak_rss_mb": max(run["peak_rss_mb"] for run in runs)}
+
+def gitCommit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def printSummary(results: Dict[str, Any], previous: Dict[str, Any] | None) -> None:
+    print(f"{'phase':<16} {'time':>10} {'nodes/s':>12}" + (f" {'change':>9}" if previous else ""))
+    for name, phase in results["phases"].items():
+        line = f"{name:<16} {phase['seconds'] * 1e3:>7.1f} ms {phase['nodes_per_s'] or 0:>12,.0f}"
+        if previous:
+            before = previous["phases"].get(name, {}).get("seconds")
+            line += f" {(phase['seconds'] / before - 1) * 100:>+8.1f}%" if before else f" {'-':>9}"
+        print(line)
+
+    line = f"{'peak RSS':<16} {results['peak_rss_mb']:>7.0f} MB"
+    if previous and previous.get("peak_rss_mb"):
+        line += f" {'':>12} {(results['peak_rss_mb'] / previous['peak_rss_mb'] - 1) * 100:>+8.1f}%"
+    print(line)
+
+def main():
+    if sys.argv[1:2] == ["--run"]:
+        # Single measured conversion in fresh interpreter, see runPhases
+        input_path, mapping_path, output, jobs = sys.argv[2:]
+        print(json.dumps(runPhases(input_path, mapping_path, output, int(jobs))))
+        return
+
+    shape, rest = parseShape(sys.argv[1:])
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.phases")
+    parser.add_argument("--input")
+    parser.add_argument("--mapping")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args(rest)
+    if not args.mapping:
+        args.mapping = "sample/mapping_capella.json" if args.input else "benchmarks/mapping_kinds.json"
+
+    with tempfile.TemporaryDirectory() as folder:
+        input_path = args.input
+        if input_path:
+            with open(input_path, "r", encoding="utf-8") as f:
+                nodes = countNodes(json.load(f))
+        else:
+            document = generateDocument(shape)
+            nodes = countNodes(document)
+            input_path = os.path.join(folder, "input.json")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(document))
+            del document
+
+        size = os.path.getsize(input_path)
+        print(f"{nodes:,} nodes, {size / 2**20:.1f} MB input, {args.repeat} runs")
+
+        runs: List[Dict[str, Any]] = []
+        for _ in range(args.repeat):
+            result = subprocess.run([sys.executable, "-m", "benchmarks.phases", "--run", input_path, args.mapping,
+                                     os.path.join(folder, "out.reqif"), str(args.jobs)],
+                                    capture_output=True, text=True)
+            if result.returncode:
+                print(result.stderr, file=sys.stderr)
+                sys.exit(1)
+            runs.append(json.loads(result.stdout.splitlines()[-1]))
+
+    results = {
+        "commit":   gitCommit(),
+        "date":     time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "input":    args.input or {"shape": shape._asdict()},
+        "mapping":  args.mapping,
+        "jobs":     args.jobs,
+        "nodes":    nodes,
+        "objects":  runs[0]["objects"],
+        "bytes":    size,
+        **summarize(runs, nodes),
+        "runs":     runs,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"compared with {previous.get('commit') or args.compare}")
+    printSummary(results, previous)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
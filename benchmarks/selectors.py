@@ -0,0 +1,53 @@
+"""
+Selector micro-benchmark: jsonpath-ng find() against compiled fast path
+
+    python -m benchmarks.selectors [input.json] [mapping.json] [repeat]
+"""
+
+import json
+import sys
+import timeit
+
+from jsonpath_ng.ext import parse
+
+from json2reqif import loadMapping
+
+
+def collectNodes(data) -> list:
+    """Flattens sample document into list of requirement nodes"""
+    nodes = [data]
+    for node in nodes:
+        nodes.extend(node.get("children", []))
+    return nodes
+
+def main():
+    input_path   = len(sys.argv) > 1 and sys.argv[1] or "sample/req_in.json"
+    mapping_path = len(sys.argv) > 2 and sys.argv[2] or "sample/mapping_capella.json"
+    repeat       = int(len(sys.argv) > 3 and sys.argv[3] or 2000)
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        nodes = collectNodes(json.load(f))
+
+    plan = loadMapping(mapping_path)
+
+    print(f"{'selector':<32} {'path':<9} {'jsonpath-ng':>12} {'compiled':>12} {'gain':>7}")
+    for expression, selector in plan.selectors.items():
+        path = parse(expression) if expression else None
+
+        def reference():
+            for node in nodes:
+                [match.value for match in path.find(node)] if path else []
+
+        def compiled():
+            for node in nodes:
+                selector.find(node)
+
+        calls = repeat * len(nodes)
+        ref_time = timeit.timeit(reference, number=repeat) / calls * 1e6
+        new_time = timeit.timeit(compiled, number=repeat) / calls * 1e6
+
+        print(f"{expression or '<empty>':<32} {'direct' if selector.steps is not None else 'jsonpath':<9} "
+              f"{ref_time:>9.2f} us {new_time:>9.2f} us {ref_time / new_time:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
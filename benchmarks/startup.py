@@ -0,0 +1,79 @@
+"""
+Startup benchmark: time to first output and to completion of command line runs on a small document
+
+    python -m benchmarks.startup [input.json] [mapping.json] [repeat] [budget_ms]
+
+Every scenario runs in a fresh interpreter, warm scenario reuses mapping compiled by the previous run.
+Slowest imports of the warm conversion are listed from `-X importtime`. With budget, exit code is 1
+when median time of the warm conversion exceeds it.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+
+def runOnce(args: List[str], env: Dict[str, str]) -> Tuple[float, float]:
+    """Seconds to the first byte on stdout and to process exit"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "json2reqif", *args], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    process.stdout.read(1)
+    first = time.perf_counter() - start
+    process.stdout.read()
+    process.wait()
+    return first, time.perf_counter() - start
+
+def slowestImports(args: List[str], env: Dict[str, str], count: int = 8) -> List[Tuple[int, str]]:
+    """Modules with the highest self import time in microseconds"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "json2reqif", *args], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        imports.append((int(self_time), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    input_path   = len(sys.argv) > 1 and sys.argv[1] or "sample/req_in.json"
+    mapping_path = len(sys.argv) > 2 and sys.argv[2] or "sample/mapping_capella.json"
+    repeat       = int(len(sys.argv) > 3 and sys.argv[3] or 10)
+    budget       = float(len(sys.argv) > 4 and sys.argv[4] or 0)
+
+    with tempfile.TemporaryDirectory() as folder:
+        env = {**os.environ, "JSON2REQIF_CACHE": folder}
+        output = os.path.join(folder, "out.reqif")
+        convert = [input_path, output, mapping_path]
+
+        scenarios = [
+            ("usage",   []),
+            ("help",    ["--help"]),
+            ("cold",    [*convert, "--no-mapping-cache"]),
+            ("warm",    convert),
+        ]
+
+        runOnce(convert, env)
+        medians: Dict[str, float] = {}
+        print(f"{'scenario':<10} {'first output':>14} {'total':>12}")
+        for name, args in scenarios:
+            runs = [runOnce(args, env) for _ in range(repeat)]
+            first = statistics.median(run[0] for run in runs) * 1e3
+            medians[name] = statistics.median(run[1] for run in runs) * 1e3
+            print(f"{name:<10} {first:>11.1f} ms {medians[name]:>9.1f} ms")
+
+        print("\nslowest imports of warm conversion (self time)")
+        for self_time, name in slowestImports(convert, env):
+            print(f"  {self_time / 1e3:>7.1f} ms  {name}")
+
+    if budget and medians["warm"] > budget:
+        print(f"\nwarm conversion {medians['warm']:.1f} ms exceeds budget {budget:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,290 @@
-from typing import Any
+from __future__ import annotations
 
-from reqif.unparser import ReqIFUnparser
+import hashlib
+import io
+import json as jsonlib
+from typing import TYPE_CHECKING, Any, Callable, List
 
-from json2reqif._types import ReqIFMappingSchema
+### Modules are imported by the phase needing them, command line start must not pay for models, reqif and lxml
+if TYPE_CHECKING:
+    from reqif.reqif_bundle import ReqIFBundle
 
-from json2reqif.converter import ReqIFConverterLib
-from json2reqif.helpers import loadConfigOrExit
+    from json2reqif.helpers.delta import Baseline
+    from json2reqif.helpers.incremental import IncrementalCache
+    from json2reqif.helpers.mapping_plan import MappingPlan
+    from json2reqif.helpers.metrics import Observer
+    from json2reqif.helpers.profiling import Profiler
+    from json2reqif.helpers.xhtml import PayloadStore, XhtmlCache
 
-def loadMapping(mapping_path: str):
+def loadMapping(mapping_path: str, cache: bool = False, observer: Observer | None = None) -> MappingPlan:
     '''
-    Loads mapping from json to reqif
+    Loads mapping from json to reqif and compiles it into reusable plan
     
     :param mapping_path: path to json with mapping definition
     :type mapping_path: str
+    :param cache: Reuse plan compiled by earlier run from the user cache folder and keep new plan there, see loadCachedMapping
+    :type cache: bool
+    :param observer: Receives the mapping phase, see Observer
+    :type observer: Observer | None
+    :return: Compiled mapping plan
+    :rtype: MappingPlan
     '''
-    return loadConfigOrExit(mapping_path)
+    from json2reqif.helpers.metrics import measure
 
-def convert (json: Any, config: ReqIFMappingSchema, output: str | None = None) -> str:
+    with measure(observer, "mapping") as counts:
+        if cache:
+            from json2reqif.helpers.mapping_cache import loadCachedMapping
+            plan, counts["cached"] = loadCachedMapping(mapping_path, observer)
+            return plan
+
+        from json2reqif.helpers import loadConfigOrExit
+        from json2reqif.helpers.mapping_plan import compileMapping
+        counts["cached"] = False
+        return compileMapping(loadConfigOrExit(mapping_path))
+
+def convert (json: Any, config: MappingPlan, output: str | None = None, xhtml_cache: XhtmlCache | None = None, jobs: int = 1, shard: bool = False, incremental: bool = False, delta: str | None = None, observer: Observer | None = None, profile: Profiler | None = None) -> str | None:
     '''
     Converts input json according to configuration and optionally writes to output
     
     :param json: Json structure to apply configuration to for target reqif generation
     :type json: Any
-    :param config: Configuration aligned with supplied schemas
-    :type config: ReqIFRootSchema
-    :param output: Optional output target
+    :param config: Compiled mapping plan, see loadMapping
+    :type config: MappingPlan
+    :param output: Optional output target, .reqifz writes zip container with images as separate files
+    :type output: str | None
+    :param xhtml_cache: Optional rich text conversion cache, shared between conversions when given
+    :type xhtml_cache: XhtmlCache | None
+    :param jobs: Number of worker processes converting rich text, 1 converts in place
+    :type jobs: int
+    :param shard: Worker processes convert top level subtrees instead of rich text
+    :type shard: bool
+    :param incremental: Reuse objects of unchanged nodes from cache next to the output, see IncrementalCache
+    :type incremental: bool
+    :param delta: Previous .reqif, .reqifz or incremental cache, only objects and hierarchy differing from it are written
+    :type delta: str | None
+    :param observer: Receives phases with their metrics and progress lines, nothing is reported without it, see Observer
+    :type observer: Observer | None
+    :param profile: Times selectors, variants and attributes of the conversion, see Profiler
+    :type profile: Profiler | None
+    :return: Generated reqif xml, None when written to output
+    :rtype: str | None
+    '''
+
+    return _convertTree(lambda: json, lambda: _treeHash(json), config, output, xhtml_cache, jobs, shard, incremental, delta, observer, profile)
+
+def convertFile (input_path: str, config: MappingPlan, output: str | None = None, xhtml_cache: XhtmlCache | None = None, jobs: int = 1, shard: bool = False, incremental: bool = False, delta: str | None = None, observer: Observer | None = None, profile: Profiler | None = None) -> str | None:
+    '''
+    Converts json file loaded by the converter itself, so the input tree is released once objects are extracted
+    
+    :param input_path: Path to json file to apply configuration to for target reqif generation
+    :type input_path: str
+    :param config: Compiled mapping plan, see loadMapping
+    :type config: MappingPlan
+    :param output: Optional output target, .reqifz writes zip container with images as separate files
     :type output: str | None
-    :return: Generated reqif xml
-    :rtype: str
+    :param xhtml_cache: Optional rich text conversion cache, shared between conversions when given
+    :type xhtml_cache: XhtmlCache | None
+    :param jobs: Number of worker processes converting rich text, 1 converts in place
+    :type jobs: int
+    :param shard: Worker processes convert top level subtrees instead of rich text
+    :type shard: bool
+    :param incremental: Reuse objects of unchanged nodes from cache next to the output, see IncrementalCache
+    :type incremental: bool
+    :param delta: Previous .reqif, .reqifz or incremental cache, only objects and hierarchy differing from it are written
+    :type delta: str | None
+    :param observer: Receives phases with their metrics and progress lines, nothing is reported without it, see Observer
+    :type observer: Observer | None
+    :param profile: Times selectors, variants and attributes of the conversion, see Profiler
+    :type profile: Profiler | None
+    :return: Generated reqif xml, None when written to output
+    :rtype: str | None
     '''
 
-    converter = ReqIFConverterLib(json, config)
-    bundle = converter.createBundle()
+    return _convertTree(lambda: _loadJson(input_path), lambda: _fileHash(input_path), config, output, xhtml_cache, jobs, shard, incremental, delta, observer, profile)
+
+def convertStream (input_path: str, config: MappingPlan, output: str | None = None, xhtml_cache: XhtmlCache | None = None, jobs: int = 1, incremental: bool = False, delta: str | None = None, observer: Observer | None = None, profile: Profiler | None = None) -> str | None:
+    '''
+    Converts json file read incrementally, memory for the input stays proportional to the tree depth
+    
+    :param input_path: Path to json file to apply configuration to for target reqif generation
+    :type input_path: str
+    :param config: Compiled mapping plan, see loadMapping
+    :type config: MappingPlan
+    :param output: Optional output target, .reqifz writes zip container with images as separate files
+    :type output: str | None
+    :param xhtml_cache: Optional rich text conversion cache, shared between conversions when given
+    :type xhtml_cache: XhtmlCache | None
+    :param jobs: Number of worker processes converting rich text, 1 converts in place
+    :type jobs: int
+    :param incremental: Reuse objects of unchanged nodes from cache next to the output, see IncrementalCache
+    :type incremental: bool
+    :param delta: Previous .reqif, .reqifz or incremental cache, only objects and hierarchy differing from it are written
+    :type delta: str | None
+    :param observer: Receives phases with their metrics and progress lines, nothing is reported without it, see Observer
+    :type observer: Observer | None
+    :param profile: Times selectors, variants and attributes of the conversion, see Profiler
+    :type profile: Profiler | None
+    :return: Generated reqif xml, None when written to output
+    :rtype: str | None
+    '''
+
+    cache = _incrementalCache(config, output, delta) if incremental else None
+    baseline = _loadBaseline(config, delta, cache, observer) if delta else None
+    input_hash = None
+    if cache is not None:
+        input_hash = _fileHash(input_path)
+        if cache.unchanged(input_hash, output):
+            if observer is not None:
+                observer.info(f"Input, mapping and output mode unchanged, {output} kept")
+            return None
+
+    from json2reqif.converter import ReqIFConverterLib
+    with open(input_path, "rb") as source:
+        converter = ReqIFConverterLib(None, config, stream=source, xhtml_cache=xhtml_cache, jobs=jobs, incremental=cache, observer=observer, profile=profile)
+        bundle = converter.createBundle()
+
+    return _output(bundle, output, converter.xhtml_cache.payloads, baseline, cache, input_hash, observer)
+
+def _convertTree (load: Callable[[], Any], inputHash: Callable[[], str], config: MappingPlan, output: str | None, xhtml_cache: XhtmlCache | None, jobs: int, shard: bool, incremental: bool, delta: str | None, observer: Observer | None, profile: Profiler | None) -> str | None:
+    """Converts tree returned by load, only the converter keeps it so extraction can drop it"""
+    from json2reqif.helpers.metrics import measure
+
+    cache = _incrementalCache(config, output, delta) if incremental else None
+    baseline = _loadBaseline(config, delta, cache, observer) if delta else None
+    input_hash = None
+    if cache is not None:
+        input_hash = inputHash()
+        if cache.unchanged(input_hash, output):
+            if observer is not None:
+                observer.info(f"Input, mapping and output mode unchanged, {output} kept")
+            return None
+
+    from json2reqif.converter import ReqIFConverterLib
+    with measure(observer, "load"):
+        json = load()
+    converter = ReqIFConverterLib(json, config, xhtml_cache=xhtml_cache, jobs=jobs, shard=shard, incremental=cache, observer=observer, profile=profile)
+    del json
+    return _output(converter.createBundle(), output, converter.xhtml_cache.payloads, baseline, cache, input_hash, observer)
+
+def _loadJson (input_path: str) -> Any:
+    """Loads json file, nesting deeper than json module recursion allows is read iteratively by ijson"""
+    try:
+        with open(input_path, "r", encoding="utf-8") as source:
+            return jsonlib.load(source)
+    except RecursionError:
+        pass
+
+    try:
+        import ijson
+    except ImportError:
+        raise Exception("Error: input nesting is too deep for json module, install ijson with `pip install ijson` or use --stream")
+
+    with open(input_path, "rb") as source:
+        return next(ijson.items(source, "", use_float=True))
+
+def _treeHash (json: Any) -> str:
+    """Hash of the tree with sorted keys, walked with explicit stack so any depth works"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    # Pending values and closing tokens, tokens are bytes which json values never are
+    stack: List[Any] = [json]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, bytes):
+            digest.update(item)
+        elif isinstance(item, dict):
+            digest.update(b"{")
+            stack.append(b"}")
+            for key in sorted(item, reverse=True):
+                stack.append(item[key])
+                stack.append(jsonlib.dumps(key).encode("utf-8") + b":")
+        elif isinstance(item, list):
+            digest.update(b"[")
+            stack.append(b"]")
+            stack.extend(reversed(item))
+        else:
+            digest.update(jsonlib.dumps(item).encode("utf-8") + b",")
+
+    return digest.hexdigest()
+
+def _fileHash (input_path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(input_path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _incrementalCache (config: MappingPlan, output: str | None, delta: str | None = None) -> IncrementalCache:
+    """Cache of the output, written next to it, delta export is kept apart from full output and from other baselines"""
+    if not output:
+        raise Exception("Error: incremental conversion requires output file")
+
+    from json2reqif.helpers.incremental import IncrementalCache
+    output_mode = f"delta {_fileHash(delta)}" if delta else "full"
+    return IncrementalCache(f"{output}.cache", IncrementalCache.mappingHash(config.config), output_mode)
+
+def _loadBaseline (config: MappingPlan, delta: str, cache: IncrementalCache | None, observer: Observer | None) -> Baseline:
+    """Baseline of delta export, objects are matched by identifier so they must survive conversion"""
+    if not config.stable_identifiers:
+        if cache is None:
+            raise Exception("Error: delta export requires stable identifiers (config.identifiers.mode) or incremental conversion")
+
+        # Without stable identifiers only the cache of the baseline run carries them over, fresh ones never match
+        if not cache.entries:
+            raise Exception(f"Error: delta export without stable identifiers requires incremental cache {cache.path} of the baseline run, "
+                            "it is missing, empty or was written with another mapping. Convert to the same output with --incremental first")
+
+    from json2reqif.helpers.delta import Baseline
+    from json2reqif.helpers.metrics import measure
+
+    with measure(observer, "baseline") as counts:
+        baseline = Baseline.load(delta)
+        counts.update(objects=len(baseline.objects), positions=len(baseline.positions))
+        if observer is not None:
+            observer.info(f"Baseline loaded: {len(baseline.objects)} SPEC-OBJECTs, {len(baseline.positions)} hierarchy entries")
+    return baseline
+
+def _output (bundle: ReqIFBundle, output: str | None, payloads: PayloadStore, baseline: Baseline | None, cache: IncrementalCache | None, input_hash: str | None, observer: Observer | None) -> str | None:
+    """Serializes bundle, pruned to changes when baseline is given, and saves incremental cache"""
+    from json2reqif.helpers.metrics import measure
+
+    specifications = bundle.core_content.req_if_content.specifications
+
+    written = payloads
+    if baseline is not None:
+        from json2reqif.helpers.delta import deltaBundle
+        with measure(observer, "delta") as counts:
+            delta = deltaBundle(bundle, baseline, payloads)
+            counts.update(changed=delta.changed, total=delta.total, context=delta.context, removed=delta.removed)
+            if observer is not None:
+                observer.info(f"Delta: {delta.changed} of {delta.total} SPEC-OBJECTs changed, {delta.context} unchanged kept for hierarchy, "
+                              f"{delta.removed} removed (not expressible in ReqIF)")
+        written = delta.payloads
+
+    with measure(observer, "write") as counts:
+        result = _unparse(bundle, output, written, observer)
+        counts["payloads"] = len(written)
+
+    if cache is not None:
+        from json2reqif.helpers.delta import hierarchyPositions
+        with measure(observer, "cache"):
+            cache.save(input_hash, payloads, dict(hierarchyPositions(specifications)))
+    return result
+
+def _unparse (bundle: ReqIFBundle, output: str | None, payloads: PayloadStore, observer: Observer | None = None) -> str | None:
+    """Serializes bundle section by section, output file is written without building the whole xml string"""
+    from json2reqif.helpers.reqif_writer import ReqIFStreamWriter, writeArchive
 
-    reqif_xml_output = ReqIFUnparser.unparse(bundle)
+    if output and output.endswith(".reqifz"):
+        writeArchive(bundle, output, payloads, observer)
+        return None
 
     if output:
         with open(output, "w", encoding="UTF-8") as output_file:
-            output_file.write(reqif_xml_output)
+            ReqIFStreamWriter(output_file, payloads, observer=observer).write(bundle)
+        return None
 
-    return reqif_xml_output
\ No newline at end of file
+    # Same writer as for files, library unparser recurses per hierarchy level
+    buffer = io.StringIO()
+    ReqIFStreamWriter(buffer, payloads, observer=observer).write(bundle)
+    return buffer.getvalue()
\ No newline at end of file
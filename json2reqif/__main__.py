@@ -1,4 +1,6 @@
 """CLI entry point."""
+import sys
+
 from json2reqif.cli import main
 
-main()
+sys.exit(main().value)
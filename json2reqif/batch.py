@@ -0,0 +1,102 @@
+"""
+JSON to ReqIF Converter - many files in one process
+"""
+
+import glob
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Tuple
+
+from json2reqif import convertFile, convertStream
+from json2reqif.helpers import loadOrExit
+from json2reqif.helpers.mapping_plan import MappingPlan
+from json2reqif.helpers.xhtml import XhtmlCache
+
+
+class BatchResult(NamedTuple):
+    input: str
+    output: str
+    ok: bool
+    seconds: float
+    error: str | None
+
+
+def collectInputs(sources: List[str], manifests: List[str] = [], output_dir: str | None = None, extension: str = ".reqif") -> List[Tuple[str, str]]:
+    """
+    Expands sources and manifests into (input, output) pairs, source is a directory, a glob pattern or a json file
+
+    Output of a source is the input name with extension, placed to output_dir or next to the input. Manifest is
+    a json object of input to output paths, relative paths are resolved against the manifest folder.
+    """
+    pairs: List[Tuple[str, str]] = []
+
+    def target(input: str) -> str:
+        path = Path(input)
+        return str(Path(output_dir or path.parent) / f"{path.stem}{extension}")
+
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            pairs.extend((str(input), target(str(input))) for input in sorted(path.glob("*.json")))
+        elif path.is_file():
+            pairs.append((source, target(source)))
+        else:
+            matches = sorted(glob.glob(source, recursive=True))
+            if not matches:
+                raise Exception(f"Error: Input not found: {source}")
+            pairs.extend((input, target(input)) for input in matches)
+
+    for source in manifests:
+        manifest = json.loads(loadOrExit(source, "Manifest"))
+        if not isinstance(manifest, dict):
+            raise Exception(f"Error: Manifest must map input to output paths: {source}")
+        folder = Path(source).parent
+        pairs.extend((str(folder / input), str(folder / output)) for input, output in manifest.items())
+
+    return pairs
+
+
+### Worker process state, mapping is compiled once by the parent, converted values are shared by files of the worker
+_batch_plan: MappingPlan | None = None
+_batch_cache: XhtmlCache | None = None
+_batch_stream = False
+
+def _initBatchWorker(plan: MappingPlan, cache_size: int, stream: bool) -> None:
+    global _batch_plan, _batch_cache, _batch_stream
+    _batch_plan = plan
+    _batch_cache = XhtmlCache(cache_size)
+    _batch_stream = stream
+
+def _convertFile(pair: Tuple[str, str]) -> BatchResult:
+    """Converts single file, without observer the converter reports nothing"""
+    input, output = pair
+    start = time.perf_counter()
+    try:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        if _batch_stream:
+            convertStream(input, _batch_plan, output, _batch_cache)
+        else:
+            convertFile(input, _batch_plan, output, _batch_cache)
+        return BatchResult(input, output, True, time.perf_counter() - start, None)
+    except Exception as e:
+        return BatchResult(input, output, False, time.perf_counter() - start, str(e))
+    finally:
+        # Images belong to their own file, next output must not carry them
+        _batch_cache.dropPayloads()
+
+def convertFiles(pairs: List[Tuple[str, str]], plan: MappingPlan, jobs: int = 1, stream: bool = False, cache_size: int = 1024) -> Iterator[BatchResult]:
+    """Converts (input, output) pairs with one compiled mapping, results are reported in order of pairs"""
+    if jobs > 1 and len(pairs) > 1:
+        with ProcessPoolExecutor(
+            max_workers = min(jobs, len(pairs)),
+            initializer = _initBatchWorker,
+            initargs    = (plan, cache_size, stream),
+        ) as executor:
+            yield from executor.map(_convertFile, pairs)
+        return
+
+    _initBatchWorker(plan, cache_size, stream)
+    for pair in pairs:
+        yield _convertFile(pair)
@@ -2,51 +2,179 @@
 JSON to ReqIF Converter - cli
 """
 
-import json
+from __future__ import annotations
+
+import argparse
 import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+from json2reqif import convertFile, convertStream, loadMapping
+from json2reqif.helpers import ExitCodes
+
+### Usage and argument errors are printed before mapping models, reqif and lxml are imported
+if TYPE_CHECKING:
+    from json2reqif.batch import BatchResult
+    from json2reqif.helpers.mapping_plan import MappingPlan
+
+def parseArguments(argv) -> argparse.Namespace:
+    """Command line definition"""
+    parser = argparse.ArgumentParser(prog="python -m json2reqif", description="JSON to ReqIF Converter")
+    parser.add_argument("input",  help="JSON file to convert")
+    parser.add_argument("output", help="Output ReqIF file, .reqifz writes zip container with images as separate files")
+    parser.add_argument("config", nargs="?", default="mapping_config.json", help="Mapping configuration (default: mapping_config.json)")
+    parser.add_argument("--stream", action="store_true", help="Read input incrementally, for exports larger than memory (requires ijson)")
+    parser.add_argument("--xhtml-cache", type=int, default=1024, metavar="SIZE", help="Number of converted rich text values kept for reuse, 0 disables (default: 1024)")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="Number of worker processes converting rich text (default: 1)")
+    parser.add_argument("--shard", action="store_true", help="With --jobs, workers convert top level subtrees instead of rich text")
+    parser.add_argument("--incremental", action="store_true", help="Reuse unchanged nodes from <output>.cache of the last run, output path must stay the same between runs")
+    parser.add_argument("--delta", metavar="BASELINE", help="Write only objects and hierarchy differing from previous .reqif, .reqifz or .cache, without stable identifiers requires --incremental to the same output path as the baseline run")
+    parser.add_argument("--no-mapping-cache", action="store_true", help="Validate and compile mapping even when cached by earlier run")
+    parser.add_argument("--metrics", metavar="FILE", help="Write time, CPU time, traced memory peak and counts of every phase as json, memory tracing slows conversion")
+    parser.add_argument("--quiet", action="store_true", help="Print errors only")
+    parser.add_argument("--progress", type=float, default=10, metavar="SECONDS", help="Interval of progress, rate and remaining time of long phases, 0 disables (default: 10)")
+    parser.add_argument("--profile", action="store_true", help="Print time and calls of every selector, variant and attribute and cProfile summary, without --jobs")
+    parser.add_argument("--profile-stats", metavar="FILE", help="With --profile, write cProfile statistics for pstats or snakeviz")
+    return parser.parse_args(argv)
+
+def parseBatchArguments(argv) -> argparse.Namespace:
+    """Command line definition of batch subcommand"""
+    parser = argparse.ArgumentParser(prog="python -m json2reqif batch", description="Converts many JSON files with one mapping in one process")
+    parser.add_argument("sources", nargs="*", help="JSON files, directories or glob patterns to convert")
+    parser.add_argument("--manifest", action="append", default=[], help="JSON object of input to output paths, may repeat")
+    parser.add_argument("--config", default="mapping_config.json", help="Mapping configuration (default: mapping_config.json)")
+    parser.add_argument("--output-dir", help="Folder for outputs of sources (default: next to the input)")
+    parser.add_argument("--extension", default=".reqif", choices=[".reqif", ".reqifz"], help="Output extension of sources (default: .reqif)")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="Number of worker processes converting files (default: 1)")
+    parser.add_argument("--stream", action="store_true", help="Read inputs incrementally (requires ijson)")
+    parser.add_argument("--xhtml-cache", type=int, default=1024, metavar="SIZE", help="Number of converted rich text values kept for reuse by each worker, 0 disables (default: 1024)")
+    return parser.parse_args(argv)
+
+def batch(argv) -> ExitCodes:
+    """Batch entry point, mapping is loaded once and every file is converted with it"""
+    args = parseBatchArguments(argv)
+
+    from json2reqif.batch import collectInputs, convertFiles
+
+    try:
+        pairs = collectInputs(args.sources, args.manifest, args.output_dir, args.extension)
+        if not pairs:
+            print("✗ Error: Nothing to convert")
+            return ExitCodes.CommandLine
+
+        config: MappingPlan = loadMapping(args.config, cache=True)
+    except Exception as e:
+        print(f"\n✗ Error: {str(e)}")
+        return ExitCodes.Fail
+
+    print("="*70)
+    print(f"JSON TO REQIF CONVERTER - {len(pairs)} files")
+    print("="*70)
+
+    start = time.perf_counter()
+    results: List[BatchResult] = []
+    for result in convertFiles(pairs, config, args.jobs, args.stream, args.xhtml_cache):
+        results.append(result)
+        print(f"{'✓' if result.ok else '✗'} [{len(results)}/{len(pairs)}] {result.input}")
 
-from json2reqif import convert
-from json2reqif._types import ReqIFMappingSchema
-from json2reqif.helpers import ExitCodes, loadConfigOrExit, loadOrExit
+    print("\n" + "="*70)
+    for result in results:
+        print(f"{'OK' if result.ok else 'FAIL':<5} {result.seconds:>8.2f}s  {result.input} -> {result.output}")
+        if result.error:
+            print(f"      {result.error}")
+
+    failed = sum(1 for result in results if not result.ok)
+    print("="*70)
+    print(f"{'✓' if not failed else '✗'} {len(results) - failed} converted, {failed} failed in {time.perf_counter() - start:.2f}s")
+    print("="*70)
+
+    return ExitCodes.OK if not failed else ExitCodes.Fail
 
 def main():
     """Main entry point"""
 
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return batch(sys.argv[2:])
+
     if len(sys.argv) < 2:
-        print("Usage: python json2reqif <input.json> <output.reqif> [config.json]")
+        print("Usage: python json2reqif <input.json> <output.reqif> [config.json] [--stream] [--xhtml-cache SIZE] [--jobs N [--shard]] [--incremental] [--delta BASELINE] [--no-mapping-cache] [--metrics FILE] [--quiet] [--progress SECONDS] [--profile [--profile-stats FILE]]")
+        print("       python json2reqif batch [sources...] [--manifest FILE] [--config FILE] [--output-dir DIR] [--jobs N] ...")
         print()
         print("Arguments:")
         print("  input.json    - JSON file to convert")
-        print("  output.reqif  - Output ReqIF file")
+        print("  output.reqif  - Output ReqIF file, .reqifz writes zip container with images as separate files")
         print("  config.yaml   - Mapping configuration (default: mapping_config.json)")
+        print("  --stream      - Read input incrementally, for exports larger than memory (requires ijson)")
+        print("  --xhtml-cache - Number of converted rich text values kept for reuse, 0 disables (default: 1024)")
+        print("  --jobs        - Number of worker processes converting rich text (default: 1)")
+        print("  --shard       - With --jobs, workers convert top level subtrees instead of rich text")
+        print("  --incremental - Reuse unchanged nodes from <output>.cache of the last run, output path must stay the same between runs")
+        print("  --delta       - Write only objects and hierarchy differing from previous .reqif, .reqifz or .cache,")
+        print("                  without stable identifiers requires --incremental to the same output path as the baseline run")
+        print("  --no-mapping-cache - Validate and compile mapping even when cached by earlier run")
+        print("  --metrics     - Write time, CPU time, traced memory peak and counts of every phase as json, memory tracing slows conversion")
+        print("  --quiet       - Print errors only")
+        print("  --progress    - Interval of progress, rate and remaining time of long phases, 0 disables (default: 10)")
+        print("  --profile     - Print time and calls of every selector, variant and attribute and cProfile summary, without --jobs")
+        print("  --profile-stats - With --profile, write cProfile statistics for pstats or snakeviz")
         return ExitCodes.CommandLine
 
+    args = parseArguments(sys.argv[1:])
+    report = print if not args.quiet else lambda *_: None
+
+    from json2reqif.helpers.metrics import ConsoleObserver, MetricsRecorder, Observer, ObserverGroup
+    recorder = MetricsRecorder(trace_memory=True) if args.metrics else None
+    observers: List[Observer] = [] if args.quiet else [ConsoleObserver(progress_interval=args.progress or None)]
+    if recorder is not None:
+        observers.append(recorder)
+    observer = ObserverGroup(*observers)
+
     try:
-        json_path = sys.argv[1]
-        output_path = sys.argv[2]
-        config_path = len(sys.argv) > 3 and sys.argv[3] or "mapping_config.json"
+        json_path = args.input
+        output_path = args.output
+        config_path = args.config
 
         # Validate input files exist
-        print("[Init] Loading JSON...")
+        report("[Init] Loading JSON...")
+
+        if not Path(json_path).exists():
+            raise Exception(f"Error: Input file not found: {json_path}")
+        config: MappingPlan = loadMapping(config_path, not args.no_mapping_cache, observer)
 
-        input = json.loads(loadOrExit(json_path,   "Input"))
-        config: ReqIFMappingSchema = loadConfigOrExit(config_path)
+        from json2reqif.helpers.xhtml import XhtmlCache
+        xhtml_cache = XhtmlCache(args.xhtml_cache)
 
-        print("="*70)
-        print("JSON TO REQIF CONVERTER")
-        print("="*70)
+        profiler: "Profiler | None" = None
+        if args.profile:
+            from json2reqif.helpers.profiling import Profiler
+            profiler = Profiler()
 
-        if input:
-            print(f"      ✓ JSON loaded")
-        else:
-            print(f"         JSON load failed")
-            return ExitCodes.Fail
+        report("="*70)
+        report("JSON TO REQIF CONVERTER")
+        report("="*70)
 
-        convert(input, config, output_path)
-        
-        print("\n" + "="*70)
-        print("✓ CONVERSION COMPLETE")
-        print("="*70)
+        if profiler is not None:
+            profiler.start()
+        try:
+            if args.stream:
+                report(f"      ✓ JSON streamed from {json_path}")
+                convertStream(json_path, config, output_path, xhtml_cache, args.jobs, args.incremental, args.delta, observer, profiler)
+            else:
+                report(f"      ✓ JSON loaded by the converter from {json_path}")
+                convertFile(json_path, config, output_path, xhtml_cache, args.jobs, args.shard, args.incremental, args.delta, observer, profiler)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+
+        if profiler is not None:
+            profiler.report()
+            if args.profile_stats:
+                profiler.write(args.profile_stats)
+
+        report("\n" + "="*70)
+        report("✓ CONVERSION COMPLETE")
+        report("="*70)
 
         return ExitCodes.OK
 
@@ -55,3 +183,8 @@ def main():
         import traceback
         traceback.print_exc()
         return ExitCodes.Fail
+
+    finally:
+        # Phases finished before a failure are written too
+        if recorder is not None:
+            recorder.write(args.metrics)
@@ -2,21 +2,18 @@
 JSON to ReqIF Converter
 """
 
-import sys
-from jsonpath_ng import DatumInContext
-from jsonpath_ng.ext import parse
+from __future__ import annotations
 
-from typing import Any, Dict, List
-from xmlrpc.client import Boolean
+import os
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Tuple
 
 from reqif.reqif_bundle import ReqIFBundle
 from reqif.models.reqif_core_content import ReqIFCoreContent
 from reqif.models.reqif_namespace_info import ReqIFNamespaceInfo
 from reqif.models.reqif_req_if_content import ReqIFReqIFContent
 from reqif.models.reqif_reqif_header import ReqIFReqIFHeader
-from reqif.models.reqif_spec_hierarchy import ReqIFSpecHierarchy
-from reqif.models.reqif_spec_object import ReqIFSpecObject, SpecObjectAttribute
 
+from reqif.models.reqif_spec_object import SpecObjectAttribute
 from reqif.models.reqif_specification import ReqIFSpecification
 
 from reqif.object_lookup import ReqIFObjectLookup
@@ -26,175 +23,444 @@ from reqif.helpers.lxml import (
     lxml_escape_for_html
 )
 
-from json2reqif._types import (
-    ReqIFMappingSchema,
-    ReqIFMappingSpecification,
-    ReqIFMappingVariant
-)
 from json2reqif.helpers.spec_datatypes import SpecDataTypesHelper
 
 from json2reqif.helpers import (
     _gen_id,
     _get_timestamp
 )
+from json2reqif.helpers.identifiers import Identifiers, StableIdentifiers
+from json2reqif.helpers.mapping_plan import CompiledSelector, Conversion, MappingPlan, VariantPlan
+from json2reqif.helpers.metrics import Observer, ProgressMeter, measure
+from json2reqif.helpers.records import HierarchyRecord, ObjectRecord, ValueTable
 from json2reqif.helpers.spec_object import buildAttribute
 from json2reqif.helpers.spec_object_types import SpecObjectTypesHelper
 from json2reqif.helpers.spec_types import SpecTypesHelper
+from json2reqif.helpers.xhtml import XhtmlCache
+
+### Parallel, streaming and incremental modes import their helpers when used
+if TYPE_CHECKING:
+    from json2reqif._types import ReqIFMappingSpecification
+    from json2reqif.helpers.incremental import IncrementalCache, RenderedSpecObject
+    from json2reqif.helpers.profiling import Profiler
+    from json2reqif.helpers.xhtml_pool import XhtmlPool
 
 
 class ReqIFConverterLib:
     """ReqIF Converter using strictdoc/reqif library"""
 
-    def __init__(self, json: Any, config: ReqIFMappingSchema):
-        """Initialize converter with JSON input"""
-
-        self._phase = 0
+    def __init__(
+        self,
+        json: Any,
+        plan: MappingPlan,
+        stream: BinaryIO | None = None,
+        xhtml_cache: XhtmlCache | None = None,
+        jobs: int = 1,
+        shard: bool = False,
+        types: Tuple[SpecDataTypesHelper, SpecTypesHelper, SpecObjectTypesHelper] | None = None,
+        incremental: IncrementalCache | None = None,
+        observer: Observer | None = None,
+        profile: Profiler | None = None
+    ):
+        """
+        Initialize converter with JSON input, or with binary stream to read it incrementally, rich text cache may be shared
+        between converters, rich text of the objects is converted by pool of worker processes when jobs is above 1,
+        with shard every top level subtree of loaded input is converted by worker instead. Types of the plan are used unless given,
+        objects of unchanged nodes are reused from incremental cache when given, phases are reported to observer when given,
+        selectors and object building are timed by profile when given
+        """
 
         self.data = json
-        self.config = config
-
-        self.data_types_helper: SpecDataTypesHelper = SpecDataTypesHelper()
-        self.types_helper: SpecTypesHelper = SpecTypesHelper(self.config.specification, self.data_types_helper)
-        self.object_types_helper: SpecObjectTypesHelper = SpecObjectTypesHelper(self.config.requirements, self.data_types_helper)
+        self.stream = stream
+        self.plan = plan
+        self.config = plan.config
+        self.xhtml_cache = xhtml_cache if xhtml_cache is not None else XhtmlCache()
+        self.xhtml_pool: XhtmlPool | None = None
+        self.jobs = jobs
+        self.shard = shard
+        self.identifiers: Identifiers = StableIdentifiers() if plan.stable_identifiers else Identifiers()
+        self.incremental = incremental
+        self.observer = observer or Observer()
+
+        # Node keys are needed by stable identifiers and incremental cache
+        self.keyed = self.identifiers.stable or incremental is not None
+        steps = plan.requirements_selector.steps
+        self.children_key = steps[0][1] if steps and len(steps) == 1 and steps[0][0] else "children"
 
         self.timestamp = _get_timestamp()
-        self.leaf_objects = []
-        self.all_objects = []
-        self.hierarchy_data = []
+        if types is None:
+            types = plan.types
+            plan.stampTypes(self.timestamp)
+            types[0].resetExtensions()
 
-    def phase (self):
-        self._phase += 1
-        return self._phase 
+        self.data_types_helper: SpecDataTypesHelper = types[0]
+        self.types_helper: SpecTypesHelper = types[1]
+        self.object_types_helper: SpecObjectTypesHelper = types[2]
 
+        # Reused objects may refer to enumeration values added by extend policy in earlier runs
+        if incremental is not None:
+            self.data_types_helper.extendValues(incremental.extended)
 
+        self.values = ValueTable(self.plan.definitions)
+        self.all_objects: List[ObjectRecord | RenderedSpecObject] = []
+        self.hierarchy_data: List[HierarchyRecord] = []
 
-    def extract_objects(self) -> None:
-        """Extract leaf nodes and attributes"""
-        print(f"\n[Phase {self.phase()}] Extracting objects...", file=sys.stderr)
+        # Extraction progress, see reportProgress
+        self.meter: ProgressMeter | None = None
+        self.expected: int | None = None
 
-        def traverse(node: Dict, req_variant: ReqIFMappingVariant, level = 1) -> ReqIFSpecHierarchy: 
-            is_leaf = len(node.get("children", [])) == 0
+        if profile is not None:
+            profile.instrument(self)
 
-            obj_data = ReqIFSpecObject(
-                identifier       = _gen_id("OBJ"),
-                attributes       = [],
+    def extract_objects(self) -> None:
+        """Extract leaf nodes and attributes"""
+        with measure(self.observer, "extract", "Extracting objects") as counts:
+            self.meter = ProgressMeter.create(self.observer, "extract", "nodes")
+            self.extract(counts)
+            self.meter = None
+
+            if self.incremental is not None:
+                self.incremental.render(self.all_objects, self.xhtml_cache.payloads)
+                self.incremental.extended = self.data_types_helper.extendedValues()
+                counts.update(reused=self.incremental.reused, rebuilt=self.incremental.rebuilt)
+                self.observer.info(f"Reused nodes:      {self.incremental.reused}, rebuilt {self.incremental.rebuilt}")
+
+            counts.update(
+                objects      = len(self.all_objects),
+                leaves       = sum(1 for obj_data in self.all_objects if obj_data.leaf),
+                hierarchy    = len(self.hierarchy_data),
+                xhtml_hits   = self.xhtml_cache.hits,
+                xhtml_misses = self.xhtml_cache.misses,
+            )
+            self.observer.info(f"Total nodes:       {counts['objects']}")
+            self.observer.info(f"Leaf nodes:        {counts['leaves']}")
+            self.observer.info(f"Hierarchy nodes:   {counts['hierarchy']}")
+
+    def extract(self, counts: Dict[str, Any]) -> None:
+        """Extract with rich text workers or subtree workers when enabled, their statistics are added to counts"""
+        if self.jobs > 1 and not (self.shard and self.stream is None):
+            from json2reqif.helpers.xhtml_pool import XhtmlPool
+            with XhtmlPool(self.jobs, self.xhtml_cache) as self.xhtml_pool:
+                self.extractInput(counts)
+            counts["xhtml_batches"] = self.xhtml_pool.batches
+            self.observer.info(f"XHTML batches:     {self.xhtml_pool.batches} on {self.jobs} workers")
+            self.xhtml_pool = None
+        else:
+            self.extractInput(counts)
+
+    def extractInput(self, counts: Dict[str, Any]) -> None:
+        if self.stream is not None:
+            self.extract_stream()
+        else:
+            self.extract_tree(counts)
+
+    def extract_tree(self, counts: Dict[str, Any]) -> None:
+        """Extract objects from fully loaded input"""
+
+        tops: List[Tuple[Any, VariantPlan, str | None]] = [*self.dispatchChildren(self.data, "")]
+
+        if self.meter is not None:
+            self.expected = _countNodes(self.data, self.children_key)
+
+        if self.shard and self.jobs > 1 and len(tops) > 1 and self.incremental is None:
+            self.extract_shards(tops)
+            counts["subtrees"] = len(tops)
+        else:
+            self.extract_subtrees(tops)
+
+    def dispatchChildren(self, node: Any, path: str | None) -> Iterator[Tuple[Any, VariantPlan, str | None]]:
+        """Yields (child, variant, path) for children of the node, path is position based key for stable identifiers"""
+        for index, container in enumerate(self.plan.requirements_selector.find(node)):
+            positions: Dict[int, int] | None = None
+            if self.keyed:
+                nodes = container.values() if isinstance(container, dict) else container if isinstance(container, list) else []
+                positions = {id(child): position for position, child in enumerate(nodes)}
+                prefix = f"{path}/{index}." if index else f"{path}/"
+
+            for req_variant, match in self.plan.dispatch(container):
+                yield match, req_variant, f"{prefix}{positions.get(id(match), 0)}" if positions is not None else None
+
+    def extract_subtrees(self, tops: List[Tuple[Any, VariantPlan, str | None]]) -> None:
+        """Extract objects of top level nodes and their subtrees"""
+
+        # Explicit stack of (node, variant, path, level, parent hierarchy), children pushed reversed to keep document order
+        stack: List[Tuple[Any, VariantPlan, str | None, int, HierarchyRecord | None]] = [
+            (match, req_variant, path, 1, None) for match, req_variant, path in reversed(tops)
+        ]
+
+        meter = self.meter
+        while stack:
+            node, req_variant, path, level, parent = stack.pop()
+            if meter is not None and len(self.all_objects) >= meter.next:
+                self.reportProgress()
+
+            hier_data = self.buildObject(node, req_variant, level, key=self.nodeKey(node, req_variant, path))
+            if parent is not None:
+                parent.add_child(hier_data)
+            else:
+                self.hierarchy_data.append(hier_data)
+
+            children = [
+                (match, child_variant, child_path, level + 1, hier_data)
+                for match, child_variant, child_path in self.dispatchChildren(node, path)
+            ]
+            children.reverse()
+            stack.extend(children)
+
+    def extract_shards(self, tops: List[Tuple[Any, VariantPlan, str | None]]) -> None:
+        """
+        Extract every top level subtree in worker process, results are merged in document order
+
+        Types of the plan are sent to every worker on its start, input subtree is sent and hierarchy comes back
+        flattened, so pickling does not recurse per level and subtrees of any depth are converted.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        shards = [(_flattenTree(match), self.plan.variants.index(req_variant), path) for match, req_variant, path in tops]
+        types = (self.data_types_helper, self.types_helper, self.object_types_helper)
+
+        with ProcessPoolExecutor(
+            max_workers = self.jobs,
+            initializer = _initShardWorker,
+            initargs    = (self.plan, types, self.xhtml_cache.size),
+        ) as executor:
+            chunksize = max(1, len(shards) // (self.jobs * 4))
+            for all_objects, flat, identifiers, payloads, extended, hits, misses in executor.map(_extractShard, shards, chunksize=chunksize):
+                self.all_objects.extend(all_objects)
+                if self.meter is not None:
+                    self.reportProgress()
+                self.data_types_helper.extendValues(extended)
+
+                # Workers see their subtree only, keys must be unique over the whole document
+                for identifier, key in identifiers:
+                    self.identifiers.register(identifier, key)
+
+                for hier_data, parent in flat:
+                    if parent is not None:
+                        flat[parent][0].add_child(hier_data)
+                    else:
+                        self.hierarchy_data.append(hier_data)
+
+                for key, (payload, mime) in payloads.items():
+                    self.xhtml_cache.payloads.payloads.setdefault(key, payload)
+                    self.xhtml_cache.payloads.types.setdefault(key, mime)
+                self.xhtml_cache.hits += hits
+                self.xhtml_cache.misses += misses
+
+        self.observer.info(f"Subtrees:          {len(shards)} on {self.jobs} workers")
+
+    def extract_stream(self) -> None:
+        """
+        Extract objects from incrementally read input, every node is converted as soon as its subtree closes
+
+        Requirements selector must be a plain `$.field` path. Node sees its children as a list of the same
+        length, so length based variant filters keep working, but selectors must not look into the children.
+        Node takes the first matching variant only, subtree of a node without variant is dropped.
+        """
+        steps = self.plan.requirements_selector.steps
+        if not steps or len(steps) != 1 or not steps[0][0]:
+            raise Exception(f"Error: streaming input requires plain `$.field` requirements selector, got: {self.plan.requirements_selector.expression}")
+        children_key = steps[0][1]
+
+        from json2reqif.helpers.stream_input import StreamEvent, readNodes
+
+        # Per open node: object slot, children as (variant index, hierarchy) or None when unmatched and path
+        frames: List[Tuple[int, List[Tuple[int, HierarchyRecord] | None], str | None]] = []
+
+        meter = self.meter
+        if meter is not None:
+            self.expected = _streamSize(self.stream)
+
+        for event, node, depth in readNodes(self.stream, children_key):
+            if event == StreamEvent.Open:
+                if meter is not None and len(self.all_objects) >= meter.next:
+                    self.reportProgress()
+                path = f"{frames[-1][2]}/{len(frames[-1][1])}" if frames and self.keyed else ""
+                frames.append((len(self.all_objects), [], path))
+                if depth:
+                    # Reserve slot to keep objects in document order like the in-memory traversal
+                    self.all_objects.append(None)
+                continue
+
+            if event == StreamEvent.Skip:
+                frames[-1][1].append(None)
+                continue
+
+            slot, children, path = frames.pop()
+            if isinstance(node.get(children_key), list):
+                node[children_key] = children
+
+            # Siblings are grouped by variant, same as dispatch over the whole children list
+            matched = sorted(filter(None, children), key=lambda child: child[0])
+
+            if depth == 0:
+                self.data = node
+                self.hierarchy_data = [hier for _, hier in matched]
+                continue
+
+            req_variant, _ = next(self.plan.dispatch([node]), (None, None))
+            if req_variant is None:
+                del self.all_objects[slot:]
+                frames[-1][1].append(None)
+                continue
+
+            hier_data = self.buildObject(node, req_variant, depth, slot, self.nodeKey(node, req_variant, path))
+            for _, hier in matched:
+                hier_data.add_child(hier)
+
+            frames[-1][1].append((self.plan.variants.index(req_variant), hier_data))
+
+    def reportProgress(self) -> None:
+        """Progress of extraction, done fraction is the read part of the stream or extracted part of the counted nodes"""
+        done = len(self.all_objects)
+        fraction = None
+        if self.expected:
+            fraction = (self.stream.tell() if self.stream is not None else done) / self.expected
+        self.meter.update(done, fraction)
+
+    def nodeKey(self, node: Any, req_variant: VariantPlan, path: str | None) -> str | None:
+        """Stable key of the node from variant and identifier selector value, or variant and position path"""
+        if not self.keyed:
+            return None
+
+        if self.plan.identifier_selector is not None:
+            value = " ".join(str(val) for val in self.plan.identifier_selector.find(node))
+            if value:
+                return f"{req_variant.type}:{value}"
+
+        return f"{req_variant.type}@{path}"
+
+    def buildObject(self, node: Dict, req_variant: VariantPlan, level: int, slot: int | None = None, key: str | None = None) -> HierarchyRecord:
+        """Build SPEC-OBJECT record for the node, stored at reserved slot when given, and its childless hierarchy entry"""
+        is_leaf = len(node.get("children", [])) == 0
+
+        # Unchanged node of incremental conversion reuses object rendered in the last run
+        fingerprint: str | None = None
+        obj_data: ObjectRecord | RenderedSpecObject | None = None
+        if self.incremental is not None and key is not None:
+            fingerprint = self.incremental.fingerprint(node, req_variant.type, self.children_key)
+            obj_data = self.incremental.lookup(key, fingerprint, self.xhtml_cache.payloads)
+
+        if obj_data is not None:
+            hier_id = obj_data.hierarchy
+            obj_data.leaf = is_leaf
+            self.identifiers.register(obj_data.identifier, key)
+            self.identifiers.register(hier_id, key)
+        else:
+            # Changed node of incremental conversion keeps identifiers of the last run, new nodes get generated ones
+            previous = self.incremental.identifiers(key) if fingerprint is not None else None
+            if previous is not None:
+                identifier, hier_id = previous
+                self.identifiers.register(identifier, key)
+                self.identifiers.register(hier_id, key)
+            else:
+                identifier = self.identifiers.generate("OBJ", key)
+                hier_id = self.identifiers.generate("HIER", key)
+
+            # Attribute values are added to the value table, the record refers to their range
+            table = self.values
+            start = len(table)
+            self.appendValues(table, node, req_variant.builders)
+
+            obj_data = ObjectRecord(
+                identifier       = identifier,
                 description      = lxml_escape_for_html(node.get("Caption", "..Empty..")),
-                spec_object_type = self.object_types_helper.getSpecType(req_variant.type).identifier, 
-                last_change      = _get_timestamp(),
+                spec_object_type = req_variant.spec_object_type,
+                last_change      = self.timestamp,
+                table            = table,
+                start            = start,
+                end              = len(table),
+                leaf             = is_leaf,
             )
 
-            has_table : Boolean = False
-
-            # Extract all attributes
-            for attr_key, attr_val in req_variant.attributes:
-                if not attr_val: continue
-
-                attr = self.object_types_helper.getSpecAttrType(req_variant.type, attr_key)
-                if attr_val.selector:
-                    val = buildAttribute(attr, " ".join(map(lambda v: v.value, parse(attr_val.selector).find(node))), self.data_types_helper)
-                else:
-                    val = buildAttribute(attr, attr_val.literal, self.data_types_helper)
-
-                if val:
-                    obj_data.attributes.append(val) 
-
-            if is_leaf:
-                self.leaf_objects.append(obj_data)
+            if fingerprint is not None:
+                self.incremental.store(key, fingerprint, obj_data, hier_id)
 
+        if slot is None:
             self.all_objects.append(obj_data)
-
-            # Intermediate node
-            hier_data = ReqIFSpecHierarchy(
-                identifier  =_gen_id("HIER"),
-                long_name   =lxml_escape_for_html(str(obj_data.description)),
-                last_change =_get_timestamp(),
-                spec_object =obj_data.identifier,
-                children    =[],
-                level       =level
-            )
-
-            if has_table:
-                hier_data.is_table_internal = True
-
-            # Recurse
-            for child in parse(self.config.requirements.selector.root).find(node):
-                for req_variant in self.config.requirements.variants: 
-                    for match in parse(req_variant.match.root).find(child.value):
-                        hier = traverse(match.value, req_variant, level + 1)
-                        hier_data.add_child(hier)
-
-            return hier_data
-
-        # Start traversal
-        for root in parse(self.config.requirements.selector.root).find(self.data):
-            for req_variant in self.config.requirements.variants:
-                for match in parse(req_variant.match.root).find(root.value):
-                    hier = traverse(match.value, req_variant)
-                    self.hierarchy_data.append(hier)
-
-
-        print(f"      ✓ Total nodes:       {len(self.all_objects)}", file=sys.stderr)
-        print(f"      ✓ Leaf nodes:        {len(self.leaf_objects)}", file=sys.stderr)
-        print(f"      ✓ Hierarchy nodes:   {len(self.hierarchy_data)}", file=sys.stderr)
+        else:
+            self.all_objects[slot] = obj_data
+
+        # Long name is escaped once more, the same string is shared when escaping changes nothing
+        long_name = lxml_escape_for_html(str(obj_data.description))
+        if long_name == obj_data.description:
+            long_name = obj_data.description
+
+        return HierarchyRecord(hier_id, obj_data.identifier, long_name, self.timestamp, level)
+
+    def appendValues(self, table: ValueTable, node: Dict, builders: List[Tuple[int, CompiledSelector | None, Conversion, str | None]]) -> None:
+        """Adds attribute values of the node selected and converted by the variant builders"""
+        for definition, selector, conversion, literal in builders:
+            val = selector.text(node) if selector is not None else literal
+            if not val:
+                continue
+
+            if conversion == Conversion.Plain:
+                table.append(definition, val)
+            elif conversion == Conversion.Xhtml:
+                if self.xhtml_pool is not None:
+                    self.xhtml_pool.defer(table, table.append(definition, ""), val)
+                else:
+                    table.append(definition, self.xhtml_cache.convert(val))
+            else:
+                val = self.data_types_helper.enumValue(table.definitions[definition].datatype_definition, val)
+                if val is not None:
+                    table.append(definition, val)
 
     def buildSpecifications (self) -> List[ReqIFSpecification]:
         """Build SPECIFICATION with hierarchy"""
-        print(f"\n[Phase {self.phase()}] Building specifications...", file=sys.stderr)
-
+        with measure(self.observer, "specifications", "Building specifications") as counts:
+            specs: List[Any] = self.plan.specification_selector.find(self.data)
 
-        specs: List[DatumInContext] = parse(self.config.specification.selector.root).find(self.data)
+            specifications = []
 
-        specifications = []
+            for match in specs:
+                specifications.append(self.buildSpecification(self.config.specification, match))
 
-        for match in specs:
-            specifications.append(self.buildSpecification(self.config.specification, match))
-
-        print(f"      ✓ Created SPECIFICATIONs: {len(specifications)}", file=sys.stderr)
+            counts["specifications"] = len(specifications)
+            self.observer.info(f"Created SPECIFICATIONs: {len(specifications)}")
         return specifications
 
-    def buildSpecification(self, spec: ReqIFMappingSpecification, data: DatumInContext) -> ReqIFSpecification:
+    def buildSpecification(self, spec: ReqIFMappingSpecification, data: Any) -> ReqIFSpecification:
         """Build SPECIFICATION entry"""
 
         attr_objects: List[SpecObjectAttribute] = []
 
-        for key, attr in self.config.specification.attributes: 
-            if not attr: continue
-
+        for key, attr, selector in self.plan.specification_attributes:
             attrType = self.types_helper.getSpecAttrType(spec.type, key)
-            val = buildAttribute(attrType, " ".join(map(lambda v: v.value, parse(attr.selector).find(data.value))), self.data_types_helper)
+            val = buildAttribute(attrType, selector.text(data), self.data_types_helper, self.xhtml_cache)
 
             if val:
                 attr_objects.append(val)
 
         specification = ReqIFSpecification(
-            identifier         = _gen_id("SPEC", parse(spec.id.root).find(data.value).pop().value),
-            long_name          = parse(spec.attributes.ReqIF_Name.selector).find(data.value).pop().value,
+            identifier         = _gen_id("SPEC", self.plan.specification_id.find(data).pop()),
+            long_name          = self.plan.specification_name.find(data).pop(),
             last_change        = _get_timestamp(),
             children           = self.hierarchy_data,
             values             = [*attr_objects],
             specification_type = self.types_helper.getSpecType(spec.type).identifier
         )
 
-        print(f"      ✓ Created SPECIFICATION with {len(specification.children or [])} children", file=sys.stderr)
+        self.observer.info(f"Created SPECIFICATION with {len(specification.children or [])} children")
 
         return specification
 
 
     def createReqIFHeader(self) -> ReqIFReqIFHeader :
         """Assemble ReqIF Header"""
-        print(f"\n[Phase {self.phase()}] Assembling ReqIF Header...", file=sys.stderr)
-
-        reqif_header = ReqIFReqIFHeader(
-            identifier     = _gen_id("HDR"),
-            creation_time  = self.timestamp,
-            repository_id  = self.config.config.repository,
-            req_if_tool_id = "JSON to ReqIF Converter",
-            req_if_version = "1.0",
-            source_tool_id = f'{self.config.config.tool} {self.config.config.toolVersion}',
-            title          = "Exported Reqif"
-        )
+        with measure(self.observer, "header", "Assembling ReqIF Header"):
+            reqif_header = ReqIFReqIFHeader(
+                identifier     = self.identifiers.generate("HDR", self.config.config.repository),
+                creation_time  = self.timestamp,
+                repository_id  = self.config.config.repository,
+                req_if_tool_id = "JSON to ReqIF Converter",
+                req_if_version = "1.0",
+                source_tool_id = f'{self.config.config.tool} {self.config.config.toolVersion}',
+                title          = "Exported Reqif"
+            )
 
-        print(f"      ✓ Header created", file=sys.stderr)
+            self.observer.info("Header created")
         return reqif_header
     
     def createCoreContent(self, b: ReqIFBundle, data) -> ReqIFCoreContent:
@@ -202,19 +468,30 @@ class ReqIFConverterLib:
 
         specifications = self.buildSpecifications()
 
+        # Input is not needed anymore, it is released before the output is written
+        self.data = None
         spec_objects = self.all_objects
 
-        core_content = ReqIFCoreContent(
-            req_if_content = ReqIFReqIFContent(
-                data_types     = [*self.data_types_helper.data_types.values()],
-                spec_objects   = spec_objects,
-                specifications = specifications,
-                spec_types     = [*self.types_helper.spec_types.values(), *self.object_types_helper.spec_types.values()],
+        with measure(self.observer, "assemble") as counts:
+            core_content = ReqIFCoreContent(
+                req_if_content = ReqIFReqIFContent(
+                    data_types     = [*self.data_types_helper.data_types.values()],
+                    spec_objects   = spec_objects,
+                    specifications = specifications,
+                    spec_types     = [*self.types_helper.spec_types.values(), *self.object_types_helper.spec_types.values()],
+                )
             )
-        )
 
-        print(f"      ✓ Assembled {len(self.all_objects)} SPEC-OBJECTs", file=sys.stderr)
-        print(f"      ✓ Assembled {len(specifications)} SPECIFICATIONs", file=sys.stderr)
+            counts.update(
+                spec_objects   = len(self.all_objects),
+                specifications = len(specifications),
+                xhtml_hits     = self.xhtml_cache.hits,
+                xhtml_misses   = self.xhtml_cache.misses,
+                payloads       = len(self.xhtml_cache.payloads),
+            )
+            self.observer.info(f"Assembled {len(self.all_objects)} SPEC-OBJECTs")
+            self.observer.info(f"Assembled {len(specifications)} SPECIFICATIONs")
+            self.observer.info(f"XHTML cache: {self.xhtml_cache.hits} hits, {self.xhtml_cache.misses} misses")
 
         return core_content
 
@@ -238,3 +515,99 @@ class ReqIFConverterLib:
         return b
 
 
+def _countNodes(data: Any, children_key: str) -> int:
+    """Nodes below the root in children lists, estimate of the objects to extract"""
+    count = 0
+    stack = [data] if isinstance(data, dict) else []
+    while stack:
+        children = stack.pop().get(children_key)
+        if isinstance(children, list):
+            children = [child for child in children if isinstance(child, dict)]
+            count += len(children)
+            stack.extend(children)
+    return count
+
+def _flattenTree(data: Any) -> List[Any]:
+    """Containers of the tree as shallow copies in breadth first order, nested container is replaced by (its index,)"""
+    containers = [data]
+    flat: List[Any] = []
+    for container in containers:
+        if isinstance(container, dict):
+            copy = {}
+            for key, val in container.items():
+                if isinstance(val, (dict, list)):
+                    copy[key] = (len(containers),)
+                    containers.append(val)
+                else:
+                    copy[key] = val
+        else:
+            copy = []
+            for val in container:
+                if isinstance(val, (dict, list)):
+                    copy.append((len(containers),))
+                    containers.append(val)
+                else:
+                    copy.append(val)
+        flat.append(copy)
+    return flat
+
+def _restoreTree(flat: List[Any]) -> Any:
+    """Tree of _flattenTree, loaded json holds no tuples so they are always container references"""
+    # References point to later containers, which are complete when visited in reverse order
+    for container in reversed(flat):
+        if isinstance(container, dict):
+            for key, val in container.items():
+                if isinstance(val, tuple):
+                    container[key] = flat[val[0]]
+        else:
+            for index, val in enumerate(container):
+                if isinstance(val, tuple):
+                    container[index] = flat[val[0]]
+    return flat[0]
+
+def _streamSize(stream: BinaryIO) -> int | None:
+    """Size of the file behind the stream, None when it has none"""
+    try:
+        return os.fstat(stream.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+### Subtree worker process state, see ReqIFConverterLib.extract_shards
+_shard_converter: ReqIFConverterLib | None = None
+
+def _initShardWorker(plan: MappingPlan, types: Tuple[SpecDataTypesHelper, SpecTypesHelper, SpecObjectTypesHelper], cache_size: int) -> None:
+    global _shard_converter
+    _shard_converter = ReqIFConverterLib(None, plan, xhtml_cache=XhtmlCache(cache_size), types=types)
+
+def _extractShard(shard: Tuple[List[Any], int, str | None]):
+    """
+    Objects with their value table, flattened hierarchy as (entry, parent index), object and hierarchy identifiers with node keys,
+    new payloads, extended enumeration values and cache counters of the subtree given as (flattened node, variant index, path)
+    """
+    converter = _shard_converter
+    flat, variant_index, path = shard
+    node = _restoreTree(flat)
+
+    converter.values = ValueTable(converter.plan.definitions)
+    converter.all_objects = []
+    converter.hierarchy_data = []
+    converter.identifiers = StableIdentifiers() if converter.plan.stable_identifiers else Identifiers()
+    cache = converter.xhtml_cache
+    cache.hits = cache.misses = 0
+
+    converter.extract_subtrees([(node, converter.plan.variants[variant_index], path)])
+
+    flat: List[Tuple[HierarchyRecord, int | None]] = []
+    stack: List[Tuple[HierarchyRecord, int | None]] = [(hier, None) for hier in reversed(converter.hierarchy_data)]
+    while stack:
+        hier_data, parent = stack.pop()
+        flat.append((hier_data, parent))
+        stack.extend((child, len(flat) - 1) for child in reversed(hier_data.children or []))
+        hier_data.children = ()
+
+    # Cached values of later subtrees refer to payloads already sent with this one
+    payloads = {key: (payload, cache.payloads.types[key]) for key, payload in cache.payloads.payloads.items()}
+    cache.payloads.clear()
+
+    return converter.all_objects, flat, converter.identifiers.registered(), payloads, converter.data_types_helper.extendedValues(), cache.hits, cache.misses
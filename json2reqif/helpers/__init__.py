@@ -1,16 +1,21 @@
-import pydantic
-import shortuuid
+from __future__ import annotations
+
+import os
 
 from datetime import datetime, timezone
 from enum import Enum
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+### Module imports, pydantic models and the schema adapter are loaded when the mapping is validated
+if TYPE_CHECKING:
+    import pydantic
 
-### Module imports
-from json2reqif._types import ReqIFMappingSchema
+    from json2reqif._types import ReqIFMappingSchema
 
 class ExitCodes(Enum):
-    OK = 0,
-    Fail = 1,
+    OK = 0
+    Fail = 1
     CommandLine = 2
 
 def loadOrExit (path: str, role: str) -> str:
@@ -21,17 +26,29 @@ def loadOrExit (path: str, role: str) -> str:
     with open(path, 'r', encoding='utf-8') as f:
         return f.read()
 
+_config_adapter: pydantic.TypeAdapter | None = None
+
+def validateConfig (config: str) -> ReqIFMappingSchema:
+    """Validates config json, schema adapter is built once per process"""
+    global _config_adapter
+    if _config_adapter is None:
+        import pydantic
+        from json2reqif._types import ReqIFMappingSchema
+        _config_adapter = pydantic.TypeAdapter(ReqIFMappingSchema)
+    return _config_adapter.validate_json(config)
+
 def loadConfigOrExit (path: str) -> ReqIFMappingSchema:
     """Returns config cast to approptiate type"""
-    config = loadOrExit(path, "Config")
-    adapter = pydantic.TypeAdapter(ReqIFMappingSchema)
-    return adapter.validate_json(config)
+    return validateConfig(loadOrExit(path, "Config"))
 
 
 def _get_timestamp() -> str:
-    """Get ISO 8601 timestamp"""
-    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000+00:00')
+    """Get ISO 8601 timestamp, SOURCE_DATE_EPOCH replaces current time for reproducible output"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    now = datetime.fromtimestamp(int(epoch), timezone.utc) if epoch else datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%dT%H:%M:%S.000+00:00')
 
 def _gen_id(prefix: str = "ID", name: str|None = None) -> str:
     """Generate unique identifier"""
+    import shortuuid
     return f"{prefix}_{shortuuid.uuid(name)}"
\ No newline at end of file
@@ -0,0 +1,249 @@
+import copy
+import hashlib
+import json
+import re
+import zipfile
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
+
+from lxml import etree
+from reqif.models.reqif_spec_hierarchy import ReqIFSpecHierarchy
+from reqif.models.reqif_specification import ReqIFSpecification
+from reqif.reqif_bundle import ReqIFBundle
+
+from json2reqif.helpers.xhtml import PayloadStore, findPlaceholders
+
+_REQIF_NS = "http://www.omg.org/spec/ReqIF/20110401/reqif.xsd"
+_XHTML_NS = "http://www.w3.org/1999/xhtml"
+
+_SPEC_OBJECT     = f"{{{_REQIF_NS}}}SPEC-OBJECT"
+_SPECIFICATION   = f"{{{_REQIF_NS}}}SPECIFICATION"
+_SPEC_HIERARCHY  = f"{{{_REQIF_NS}}}SPEC-HIERARCHY"
+_SPEC_OBJECT_REF = f"{{{_REQIF_NS}}}SPEC-OBJECT-REF"
+
+# Image data as written inline, lifted to placeholder or moved to .reqifz member, all compared by payload key
+_INLINE   = re.compile(r'data:[^;,"\s<>]*;base64,([A-Za-z0-9+/]{256,})=*')
+_LIFTED   = re.compile(r'data:[^;,"\s<>]*;base64,@([0-9a-f]{32})@=*')
+_ARCHIVED = re.compile(r'files/([0-9a-f]{32})\.[A-Za-z0-9]+')
+
+_PARSER = etree.XMLParser(remove_blank_text=True, huge_tree=True)
+
+# Hierarchy entry position as (spec object, parent entry or specification, previous sibling)
+Position = Tuple[str, str, str | None]
+
+
+def _payloadKey(m: re.Match) -> str:
+    return f"payload:{hashlib.blake2b(m.group(1).encode('ascii'), digest_size=16).hexdigest()}"
+
+def objectFingerprint(element: etree._Element) -> str:
+    """Hash of canonical SPEC-OBJECT without LAST-CHANGE, insensitive to indentation and to the way images are stored"""
+    element.attrib.pop("LAST-CHANGE", None)
+    text = etree.tostring(element, method="c14n", exclusive=True, with_tail=False).decode("utf-8")
+    if "base64," in text or "files/" in text:
+        text = _LIFTED.sub(r"payload:\1", text)
+        text = _ARCHIVED.sub(r"payload:\1", text)
+        text = _INLINE.sub(_payloadKey, text)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def fragmentFingerprint(xml: str) -> str:
+    """Fingerprint of SPEC-OBJECT xml fragment as written by the converter"""
+    root = etree.fromstring(f'<REQ-IF xmlns="{_REQIF_NS}" xmlns:xhtml="{_XHTML_NS}">{xml}</REQ-IF>', _PARSER)
+    return objectFingerprint(root[0])
+
+def hierarchyPositions(specifications: List[ReqIFSpecification]) -> Iterator[Tuple[str, Position]]:
+    """Yields (hierarchy identifier, position) of every hierarchy entry in document order"""
+    for specification in specifications:
+        stack: List[Tuple[ReqIFSpecHierarchy, str, str | None]] = []
+        previous = None
+        for hierarchy in specification.children or []:
+            stack.append((hierarchy, specification.identifier, previous))
+            previous = hierarchy.identifier
+        stack.reverse()
+
+        while stack:
+            hierarchy, parent, previous = stack.pop()
+            yield hierarchy.identifier, (hierarchy.spec_object, parent, previous)
+
+            children: List[Tuple[ReqIFSpecHierarchy, str, str | None]] = []
+            previous = None
+            for child in hierarchy.children or []:
+                children.append((child, hierarchy.identifier, previous))
+                previous = child.identifier
+            stack.extend(reversed(children))
+
+
+class Baseline:
+    '''
+    SPEC-OBJECT fingerprints and hierarchy positions of a previous export
+
+    Loaded from .reqif, .reqifz or from the state file of incremental conversion, documents are read with
+    iterparse and every element is dropped once processed, so memory is proportional to the number of
+    identifiers rather than to the document size.
+    '''
+    def __init__(self):
+        self.objects: Dict[str, str] = {}
+        self.positions: Dict[str, Position] = {}
+        self.specifications: Set[str] = set()
+
+    @classmethod
+    def load(cls, path: str) -> "Baseline":
+        baseline = cls()
+        if path.endswith(".reqifz"):
+            with zipfile.ZipFile(path) as archive:
+                names = [name for name in archive.namelist() if name.endswith(".reqif")]
+                if not names:
+                    raise Exception(f"Error: No .reqif document in baseline {path}")
+                with archive.open(names[0]) as source:
+                    baseline.readReqIF(source)
+        elif path.endswith(".reqif"):
+            with open(path, "rb") as source:
+                baseline.readReqIF(source)
+        else:
+            baseline.readState(path)
+
+        return baseline
+
+    def readReqIF(self, source) -> None:
+        """Reads spec objects and hierarchy of ReqIF document"""
+        parents: List[str] = []
+        previous: List[str | None] = []
+        objects: Dict[str, str] = {}
+
+        events = etree.iterparse(source, events=("start", "end"), huge_tree=True, remove_blank_text=True,
+                                 tag=(_SPEC_OBJECT, _SPECIFICATION, _SPEC_HIERARCHY, _SPEC_OBJECT_REF))
+        for event, element in events:
+            tag = element.tag
+            if event == "start":
+                if tag == _SPECIFICATION:
+                    self.specifications.add(element.get("IDENTIFIER"))
+                    parents.append(element.get("IDENTIFIER"))
+                    previous.append(None)
+                elif tag == _SPEC_HIERARCHY:
+                    identifier = element.get("IDENTIFIER")
+                    self.positions[identifier] = ("", parents[-1], previous[-1])
+                    previous[-1] = identifier
+                    parents.append(identifier)
+                    previous.append(None)
+                continue
+
+            if tag == _SPEC_OBJECT:
+                self.objects[element.get("IDENTIFIER")] = objectFingerprint(element)
+            elif tag == _SPEC_OBJECT_REF:
+                if parents and parents[-1] in self.positions:
+                    objects[parents[-1]] = (element.text or "").strip()
+                continue
+            else:
+                parents.pop()
+                previous.pop()
+
+            # Processed subtree is not needed anymore
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+        for identifier, spec_object in objects.items():
+            _, parent, previous_sibling = self.positions[identifier]
+            self.positions[identifier] = (spec_object, parent, previous_sibling)
+
+    def readState(self, path: str) -> None:
+        """Reads rendered objects and hierarchy positions of incremental conversion state file"""
+        try:
+            import ijson
+        except ImportError:
+            with open(path, "r", encoding="utf-8") as source:
+                data = json.load(source)
+            self.readEntries(data.get("entries", {}).items(), data.get("positions", {}).items())
+            return
+
+        with open(path, "rb") as source:
+            with open(path, "rb") as second:
+                self.readEntries(ijson.kvitems(source, "entries"), ijson.kvitems(second, "positions"))
+
+    def readEntries(self, entries: Iterator[Tuple[str, Dict]], positions: Iterator[Tuple[str, List]]) -> None:
+        for _, entry in entries:
+            self.objects[entry["object"]] = fragmentFingerprint(entry["xml"])
+
+        for identifier, position in positions:
+            self.positions[identifier] = tuple(position)
+            self.specifications.add(position[1])
+        self.specifications.difference_update(self.positions)
+
+
+class Delta(NamedTuple):
+    payloads: PayloadStore
+    changed: int
+    context: int
+    removed: int
+    total: int
+
+
+def deltaBundle(bundle: ReqIFBundle, baseline: Baseline, payloads: PayloadStore) -> Delta:
+    """
+    Prunes bundle to spec objects and hierarchy entries differing from the baseline
+
+    Hierarchy entry is kept when its object changed, it moved, or a descendant is kept, so every kept entry
+    has its path to the specification. Objects of kept entries are written even when unchanged, as hierarchy
+    references must resolve within the document. Objects missing from the new export cannot be expressed
+    in ReqIF and are only counted. Returns payloads referenced by kept objects.
+    """
+    content = bundle.core_content.req_if_content
+
+    changed: Set[str] = set()
+    rendered: Dict[str, str] = {}
+    for spec_object in content.spec_objects:
+        xml = spec_object.render()
+        if baseline.objects.get(spec_object.identifier) != fragmentFingerprint(xml):
+            changed.add(spec_object.identifier)
+        rendered[spec_object.identifier] = xml
+
+    positions = dict(hierarchyPositions(content.specifications))
+    moved = {identifier for identifier, position in positions.items() if baseline.positions.get(identifier) != position}
+
+    referenced: Set[str] = set()
+    specifications: List[ReqIFSpecification] = []
+    for specification in content.specifications:
+        children = _pruneHierarchy(specification.children or [], changed, moved, referenced)
+        if children or specification.identifier not in baseline.specifications:
+            specification = copy.copy(specification)
+            specification.children = children or None
+            specifications.append(specification)
+
+    kept = changed | referenced
+    content.spec_objects = [spec_object for spec_object in content.spec_objects if spec_object.identifier in kept]
+    content.specifications = specifications
+
+    store = PayloadStore()
+    for identifier in kept:
+        for key in findPlaceholders(rendered[identifier]):
+            if key in payloads.payloads:
+                store.payloads[key] = payloads.payloads[key]
+                store.types[key] = payloads.types[key]
+
+    return Delta(
+        payloads = store,
+        changed  = len(changed),
+        context  = len(referenced - changed),
+        removed  = len(baseline.objects.keys() - rendered.keys()),
+        total    = len(rendered),
+    )
+
+def _pruneHierarchy(hierarchies: List[ReqIFSpecHierarchy], changed: Set[str], moved: Set[str], referenced: Set[str]) -> List[ReqIFSpecHierarchy]:
+    """Copies of kept entries with kept children, post order walk with explicit stack"""
+    # Pruned copy of every kept entry by id of the original, removed once its parent takes it
+    kept: Dict[int, ReqIFSpecHierarchy] = {}
+    stack: List[Tuple[ReqIFSpecHierarchy, bool]] = [(hierarchy, False) for hierarchy in reversed(hierarchies)]
+
+    while stack:
+        hierarchy, visited = stack.pop()
+        if not visited:
+            stack.append((hierarchy, True))
+            stack.extend((child, False) for child in reversed(hierarchy.children or []))
+            continue
+
+        children = [kept.pop(id(child)) for child in hierarchy.children or [] if id(child) in kept]
+        if children or hierarchy.spec_object in changed or hierarchy.identifier in moved:
+            pruned = copy.copy(hierarchy)
+            pruned.children = children or None
+            kept[id(hierarchy)] = pruned
+            referenced.add(hierarchy.spec_object)
+
+    return [kept.pop(id(hierarchy)) for hierarchy in hierarchies if id(hierarchy) in kept]
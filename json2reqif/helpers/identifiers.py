@@ -0,0 +1,51 @@
+import base64
+import hashlib
+from typing import Dict, List, Tuple
+
+from json2reqif.helpers import _gen_id
+
+
+class Identifiers:
+    '''Random identifiers, key is ignored, see _gen_id'''
+    stable = False
+
+    def generate(self, prefix: str, key: str | None = None) -> str:
+        return _gen_id(prefix)
+
+    def register(self, identifier: str, key: str | None = None) -> None:
+        pass
+
+    def registered(self) -> List[Tuple[str, str | None]]:
+        """(identifier, key) of every remembered identifier"""
+        return []
+
+
+class StableIdentifiers(Identifiers):
+    '''
+    Identifiers derived from stable key of the element, same input always gives same identifiers
+
+    Key and prefix are hashed with blake2b and encoded with url-safe base64, 22 characters like shortuuid.
+    Every identifier is remembered with its key, so duplicate keys and hash collisions are reported.
+    '''
+    stable = True
+
+    def __init__(self):
+        self.keys: Dict[str, str | None] = {}
+
+    def generate(self, prefix: str, key: str | None = None) -> str:
+        digest = hashlib.blake2b(f"{prefix}\0{key}".encode("utf-8"), digest_size=16).digest()
+        identifier = f"{prefix}_{base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')}"
+        self.register(identifier, key)
+        return identifier
+
+    def register(self, identifier: str, key: str | None = None) -> None:
+        """Remembers identifier, fails when it was already generated"""
+        if identifier in self.keys:
+            known = self.keys[identifier]
+            if known == key or known is None or key is None:
+                raise Exception(f"Error: Duplicate identifier {identifier} for key `{key or known}`, requirement keys must be unique")
+            raise Exception(f"Error: Identifier collision {identifier} between keys `{known}` and `{key}`")
+        self.keys[identifier] = key
+
+    def registered(self) -> List[Tuple[str, str | None]]:
+        return list(self.keys.items())
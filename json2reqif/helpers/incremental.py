@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Set, Tuple
+
+from json2reqif.helpers.records import ObjectRecord
+from json2reqif.helpers.xhtml import PayloadStore, findPlaceholders
+
+
+class RenderedSpecObject:
+    '''SPEC-OBJECT reused from incremental cache, written as stored xml fragment'''
+    __slots__ = ("identifier", "hierarchy", "description", "xml", "leaf")
+
+    def __init__(self, identifier: str, hierarchy: str, description: str, xml: str, leaf: bool = False):
+        self.identifier = identifier
+        self.hierarchy = hierarchy
+        self.description = description
+        self.xml = xml
+        self.leaf = leaf
+
+    def render(self) -> str:
+        return self.xml
+
+
+class IncrementalCache:
+    '''
+    Per node cache of rendered SPEC-OBJECTs, stored as json next to the output
+
+    Entry is keyed by node key (see ReqIFConverterLib.nodeKey) and holds fingerprint of the node content
+    without its children, object and hierarchy identifiers and rendered xml with image payloads it refers to.
+    Whole cache is dropped when mapping changes, entries of nodes missing from the last run are not kept.
+    Output mode tells full output from delta export against baseline of given content, run is skipped only in the same mode.
+    Hierarchy positions of the last run are stored as well, so the cache can serve as baseline of delta export,
+    and so are enumeration values added by extend policy, which reused objects may refer to.
+    '''
+    VERSION = 2
+
+    def __init__(self, path: str, mapping_hash: str, output_mode: str = "full"):
+        self.path = path
+        self.mapping_hash = mapping_hash
+        self.output_mode = output_mode
+        self.input_hash: str | None = None
+        self.last_output_mode: str | None = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.payloads: Dict[str, Tuple[str, str]] = {}
+        self.extended: Dict[str, List[str]] = {}
+
+        self.reused = 0
+        self.rebuilt = 0
+
+        # Entries of this run, objects are rendered on save when attribute values are complete
+        self._kept: Dict[str, Dict[str, Any]] = {}
+        self._built: List[Tuple[str, str, ObjectRecord, str]] = []
+        self._seen: Set[str] = set()
+        self._duplicates: Set[str] = set()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION and data.get("mapping") == mapping_hash:
+                self.input_hash = data.get("input")
+                self.last_output_mode = data.get("output")
+                self.entries = data.get("entries", {})
+                self.payloads = {key: tuple(val) for key, val in data.get("payloads", {}).items()}
+                self.extended = data.get("extended", {})
+
+    @staticmethod
+    def mappingHash(config: Any) -> str:
+        """Hash of validated mapping, any change invalidates whole cache"""
+        return hashlib.blake2b(config.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def fingerprint(node: Dict, variant_type: str, children_key: str) -> str:
+        """Hash of the node content without children"""
+        content = {key: val for key, val in node.items() if key != children_key and key != "children"}
+        text = json.dumps([variant_type, content], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def unchanged(self, input_hash: str, output: str) -> bool:
+        """True when input, mapping and output mode are the same as in the last run and output is still there"""
+        return self.input_hash == input_hash and self.last_output_mode == self.output_mode and os.path.exists(output)
+
+    def lookup(self, key: str, fingerprint: str, payloads: PayloadStore) -> RenderedSpecObject | None:
+        """Cached object of unchanged node, its payloads are restored to the store"""
+        if key in self._seen:
+            # Duplicate key, nodes sharing it are not cached
+            self._duplicates.add(key)
+            return None
+        self._seen.add(key)
+
+        entry = self.entries.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+
+        for payload_key in entry["payloads"]:
+            payload, mime = self.payloads[payload_key]
+            payloads.payloads.setdefault(payload_key, payload)
+            payloads.types.setdefault(payload_key, mime)
+
+        self._kept[key] = entry
+        self.reused += 1
+        return RenderedSpecObject(entry["object"], entry["hierarchy"], entry["description"], entry["xml"])
+
+    def identifiers(self, key: str) -> Tuple[str, str] | None:
+        """Object and hierarchy identifiers of the last run for the changed node, so it keeps its identity when rebuilt"""
+        entry = self.entries.get(key)
+        if entry is None or key in self._duplicates:
+            return None
+        return entry["object"], entry["hierarchy"]
+
+    def store(self, key: str, fingerprint: str, obj_data: ObjectRecord, hier_id: str) -> None:
+        """Remembers built object, it is rendered once attribute values are complete"""
+        self.rebuilt += 1
+        self._built.append((key, fingerprint, obj_data, hier_id))
+
+    def render(self, objects: List[Any], payloads: PayloadStore) -> None:
+        """Replaces built objects with rendered ones, so the xml is rendered once for the output and the cache"""
+        rendered: Dict[int, RenderedSpecObject] = {}
+        for key, fingerprint, obj_data, hier_id in self._built:
+            xml = obj_data.render()
+            self._kept[key] = {
+                "fingerprint": fingerprint,
+                "object":      obj_data.identifier,
+                "hierarchy":   hier_id,
+                "description": obj_data.description,
+                "xml":         xml,
+                "payloads":    [payload_key for payload_key in findPlaceholders(xml) if payload_key in payloads.payloads],
+            }
+            rendered[id(obj_data)] = RenderedSpecObject(obj_data.identifier, hier_id, obj_data.description, xml, obj_data.leaf)
+        self._built = []
+
+        for index, obj_data in enumerate(objects):
+            objects[index] = rendered.get(id(obj_data), obj_data)
+
+    def save(self, input_hash: str, payloads: PayloadStore, positions: Dict[str, Tuple[str, str, str | None]] = {}) -> None:
+        """Writes entries and hierarchy positions of this run"""
+        entries = dict(self._kept)
+        for key in self._duplicates:
+            entries.pop(key, None)
+
+        used = {payload_key for entry in entries.values() for payload_key in entry["payloads"]}
+        data = {
+            "version":  self.VERSION,
+            "mapping":  self.mapping_hash,
+            "input":    input_hash,
+            "output":   self.output_mode,
+            "entries":  entries,
+            "payloads": {key: [payloads.payloads[key], payloads.types[key]] for key in used},
+            "positions": positions,
+            "extended": self.extended,
+        }
+
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(f"{self.path}.tmp", self.path)
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Tuple
+
+from json2reqif.__about__ import __version__
+from json2reqif.helpers import loadOrExit, validateConfig
+from json2reqif.helpers.mapping_plan import PLAN_VERSION, MappingPlan, compileMapping
+from json2reqif.helpers.metrics import Observer
+
+
+### Modules defining classes of pickled plans, an edit of any of them compiles cached mappings again
+_LAYOUT_MODULES = ("mapping_plan", "records", "spec_types", "spec_datatypes", "spec_object_types")
+
+_layout_hash: str | None = None
+
+def layoutHash() -> str:
+    """Hash of the sources of plan layout modules, computed once per process, modules installed without sources count by name"""
+    global _layout_hash
+    if _layout_hash is None:
+        digest = hashlib.blake2b(digest_size=16)
+        folder = Path(__file__).parent
+        for name in _LAYOUT_MODULES:
+            try:
+                digest.update((folder / f"{name}.py").read_bytes())
+            except OSError:
+                digest.update(name.encode("utf-8"))
+        _layout_hash = digest.hexdigest()
+    return _layout_hash
+
+def cacheFolder() -> Path:
+    """Folder of cached mappings, JSON2REQIF_CACHE overrides the user cache folder"""
+    folder = os.environ.get("JSON2REQIF_CACHE")
+    if folder:
+        return Path(folder)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "json2reqif"
+
+def loadCachedMapping(path: str, observer: Observer | None = None) -> Tuple[MappingPlan, bool]:
+    """
+    Compiled mapping plan with its types and whether it came from cache, which holds mappings seen before
+
+    Cache entry is keyed by the mapping content, package, plan layout version, sources of layout modules and python version,
+    so any of them changing validates and compiles the mapping again. Unreadable entries are rebuilt with warning to observer, failure to write one is ignored.
+    """
+    config = loadOrExit(path, "Config")
+    key = hashlib.blake2b(
+        f"{__version__}\0{PLAN_VERSION}\0{layoutHash()}\0{sys.version_info.major}.{sys.version_info.minor}\0{config}".encode("utf-8"),
+        digest_size=16
+    ).hexdigest()
+    entry = cacheFolder() / f"mapping-{key}.pickle"
+
+    try:
+        with open(entry, "rb") as f:
+            plan = pickle.load(f)
+        if isinstance(plan, MappingPlan):
+            return plan, True
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        if observer is not None:
+            observer.warning(f"Mapping cache entry {entry} ignored: {e}")
+
+    plan = compileMapping(validateConfig(config))
+
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{entry}.{os.getpid()}.tmp", "wb") as f:
+            pickle.dump(plan, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{entry}.{os.getpid()}.tmp", entry)
+    except OSError:
+        pass
+
+    return plan, False
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from jsonpath_ng.jsonpath import Child, Fields, Index, Root
+from jsonpath_ng.ext import parse
+from jsonpath_ng.ext.filter import OPERATOR_MAP, Expression, Filter
+from jsonpath_ng.ext.iterable import Len
+from reqif.models.reqif_spec_object_type import SpecAttributeDefinition
+from reqif.models.reqif_types import SpecObjectAttributeType
+
+from json2reqif.helpers.spec_datatypes import SpecDataTypesHelper
+from json2reqif.helpers.spec_object_types import SpecObjectTypesHelper
+from json2reqif.helpers.spec_types import SpecTypesHelper
+from json2reqif.helpers.xhtml import convertXhtml
+
+if TYPE_CHECKING:
+    from json2reqif._types import ReqIFMappingSchema, ReqIFMappingVariant
+
+### Layout of pickled plans, cached plans of other layout are compiled again, see loadCachedMapping
+PLAN_VERSION = 3
+
+_MISSING = object()
+
+
+class Conversion(IntEnum):
+    '''Conversion of selected attribute value into its ReqIF form'''
+    Plain       = 0
+    Xhtml       = 1
+    Enumeration = 2
+
+_CONVERSIONS: Dict[SpecObjectAttributeType, Conversion] = {
+    SpecObjectAttributeType.XHTML:       Conversion.Xhtml,
+    SpecObjectAttributeType.ENUMERATION: Conversion.Enumeration,
+}
+
+def _compileSteps(path) -> Optional[List[Tuple[bool, Any]]]:
+    """Flattens plain `$`, `$.a.b` and `$.a[0]` chains into (is_field, key) lookups, None for real expressions"""
+    kind = type(path)
+    if kind is Root:
+        return []
+    if kind is Fields and len(path.fields) == 1 and path.fields[0] != "*":
+        return [(True, path.fields[0])]
+    if kind is Index:
+        return [(False, path.index)]
+    if kind is Child and type(path.right) is not Root:
+        left = _compileSteps(path.left)
+        right = _compileSteps(path.right)
+        if left is not None and right is not None:
+            return left + right
+
+    return None
+
+def _resolve(steps: List[Tuple[bool, Any]], data: Any) -> Any:
+    """Same semantics as jsonpath-ng Fields/Index without DatumInContext allocation, _MISSING for no match"""
+    value = data
+    for is_field, key in steps:
+        if is_field:
+            try:
+                value = value.get(key, _MISSING)
+            except (TypeError, AttributeError):
+                return _MISSING
+            if value is _MISSING:
+                return _MISSING
+        elif value and len(value) > key:
+            value = value[key]
+        else:
+            return _MISSING
+
+    return value
+
+
+class CompiledSelector:
+    '''JSONPath selector parsed once and reused for every node
+
+    Plain field chains and fixed indices are resolved with direct dict/list lookups,
+    filters, slices, wildcards and recursive descent are delegated to jsonpath-ng.
+    Empty expression never matches.
+    '''
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.path = parse(expression) if expression else None
+        self.steps = _compileSteps(self.path) if self.path else None
+
+        if not self.path:
+            self.find = self._findNothing
+        elif self.steps is not None:
+            self.find = self._findDirect
+
+    def find(self, data: Any) -> List[Any]:
+        """Returns values of all matches"""
+        return [match.value for match in self.path.find(data)]
+
+    def _findNothing(self, data: Any) -> List[Any]:
+        return []
+
+    def _findDirect(self, data: Any) -> List[Any]:
+        value = _resolve(self.steps, data)
+        return [] if value is _MISSING else [value]
+
+    def text(self, data: Any) -> str:
+        """Returns all matches joined in a single string"""
+        return " ".join(self.find(data))
+
+
+class VariantDispatcher:
+    '''Routes nodes to variants sharing one discriminator with single dict lookup'''
+    def __init__(self, steps: Tuple[Tuple[bool, Any], ...], non_empty: bool):
+        self.steps = steps
+        self.non_empty = non_empty
+        self.routes: Dict[Any, List[int]] = {}
+
+    def key(self, node: Any) -> Any:
+        """Discriminator value of the node, None when no variant can match"""
+        value = _resolve(self.steps, node)
+        if value is _MISSING:
+            return None
+        if self.non_empty:
+            try:
+                return len(value) > 0
+            except TypeError:
+                return None
+
+        return value if type(value) is str else None
+
+
+def _inferDispatch(path) -> Optional[Tuple[Tuple[Tuple[bool, Any], ...], bool, List[Any]]]:
+    """Recognizes `$[?field.`len` <op> N]` and `$[?field == 'X']` filters as (steps, non_empty, keys)"""
+    if type(path) is not Child or type(path.left) is not Root or type(path.right) is not Filter:
+        return None
+    if len(path.right.expressions) != 1 or type(path.right.expressions[0]) is not Expression:
+        return None
+
+    expression = path.right.expressions[0]
+    target = expression.target
+    if expression.op is None:
+        return None
+
+    ### Length comparison, only when the outcome for any non-empty length is the same
+    if type(target) is Child and type(target.right) is Len and type(expression.value) is int:
+        steps = _compileSteps(target.left)
+        if steps is None:
+            return None
+
+        compare = OPERATOR_MAP[expression.op]
+        outcomes = set(compare(n, expression.value) for n in range(1, abs(expression.value) + 3))
+        if len(outcomes) != 1:
+            return None
+
+        keys = [key for key, n in ((False, 0), (True, 1)) if compare(n, expression.value)]
+        return tuple(steps), True, keys
+
+    ### Plain string equality
+    if expression.op in ("==", "=") and type(expression.value) is str:
+        steps = _compileSteps(target)
+        if steps is None:
+            return None
+
+        return tuple(steps), False, [expression.value]
+
+    return None
+
+
+class VariantPlan:
+    '''Requirement variant with pre-parsed match selector and attribute builders'''
+    def __init__(self, variant: ReqIFMappingVariant, plan: "MappingPlan"):
+        self.variant = variant
+        self.type = variant.type
+        self.match = plan.compileSelector(variant.match.root)
+        self.dispatch = self._declaredDispatch(variant) or _inferDispatch(self.match.path)
+
+        data_types_helper, _, object_types_helper = plan.types
+        self.spec_object_type: str = object_types_helper.getSpecType(variant.type).identifier
+
+        ### Attribute builders as (definition index, selector, conversion, literal), empty selector falls back
+        ### to literal converted here once, it is then added to every object as it is
+        self.builders: List[Tuple[int, Optional[CompiledSelector], Conversion, Optional[str]]] = []
+        for key, val in variant.attributes:
+            if not val: continue
+            attr = object_types_helper.getSpecAttrType(variant.type, key)
+            definition = plan.definitionIndex(attr)
+            conversion = _CONVERSIONS.get(attr.attribute_type, Conversion.Plain)
+
+            if val.selector:
+                self.builders.append((definition, plan.compileSelector(val.selector), conversion, None))
+            elif val.literal:
+                self.builders.append((definition, None, *self._convertLiteral(attr, val.literal, conversion, data_types_helper)))
+
+    def find(self, container: Any) -> List[Any]:
+        """Nodes of the container matched by the variant filter"""
+        return self.match.find(container)
+
+    @staticmethod
+    def _convertLiteral(attr: SpecAttributeDefinition, literal: str, conversion: Conversion, data_types_helper: SpecDataTypesHelper) -> Tuple[Conversion, str]:
+        """Converted literal, rich text with images stays raw as its payloads belong to the conversion"""
+        if conversion == Conversion.Xhtml:
+            return (conversion, literal) if "base64," in literal else (Conversion.Plain, convertXhtml(literal))
+
+        # Literal is part of the mapping, it must be declared value whatever the unknown value policy
+        if conversion == Conversion.Enumeration:
+            return Conversion.Plain, data_types_helper.enum_indices[attr.datatype_definition].strict(literal)
+
+        return Conversion.Plain, literal
+
+    @staticmethod
+    def _declaredDispatch(variant: ReqIFMappingVariant):
+        """Discriminator declared in mapping, replaces match filter evaluation"""
+        dispatch = variant.dispatch
+        if not dispatch:
+            return None
+
+        steps = _compileSteps(parse(dispatch.selector))
+        if steps is None:
+            raise Exception(f"Error: dispatch selector of variant {variant.type} must be a plain path: {dispatch.selector}")
+        if (dispatch.equals is None) == (dispatch.nonEmpty is None):
+            raise Exception(f"Error: dispatch of variant {variant.type} requires exactly one of equals or nonEmpty")
+
+        if dispatch.equals is not None:
+            return tuple(steps), False, [dispatch.equals]
+
+        return tuple(steps), True, [dispatch.nonEmpty]
+
+
+class MappingPlan:
+    '''Mapping configuration with every JSONPath compiled and every type definition created up front'''
+    def __init__(self, config: ReqIFMappingSchema):
+        self.config = config
+        self.selectors: Dict[str, CompiledSelector] = {}
+        self.definitions: List[SpecAttributeDefinition] = []
+
+        data_types_helper = SpecDataTypesHelper()
+        self.types: Tuple[SpecDataTypesHelper, SpecTypesHelper, SpecObjectTypesHelper] = (
+            data_types_helper,
+            SpecTypesHelper(config.specification, data_types_helper),
+            SpecObjectTypesHelper(config.requirements, data_types_helper),
+        )
+
+        spec = config.specification
+        self.specification_selector = self.compileSelector(spec.selector.root)
+        self.specification_id = self.compileSelector(spec.id.root)
+        self.specification_name = self.compileSelector(spec.attributes.ReqIF_Name.selector)
+        self.specification_attributes: List[Tuple[str, Any, CompiledSelector]] = []
+        for key, val in spec.attributes:
+            if not val: continue
+            self.specification_attributes.append((key, val, self.compileSelector(val.selector)))
+
+        self.requirements_selector = self.compileSelector(config.requirements.selector.root)
+
+        identifiers = config.config.identifiers
+        self.stable_identifiers = bool(identifiers and identifiers.mode and identifiers.mode.value == "stable")
+        self.identifier_selector = self.compileSelector(identifiers.selector) if identifiers and identifiers.selector else None
+        self.variants: List[VariantPlan] = [VariantPlan(variant, self) for variant in config.requirements.variants]
+
+        ### Variants sharing discriminator are grouped into single lookup, the rest keep filter evaluation
+        self.dispatchers: Dict[Tuple[Any, bool], VariantDispatcher] = {}
+        self.fallback_variants: List[int] = []
+        for index, variant in enumerate(self.variants):
+            if not variant.dispatch:
+                self.fallback_variants.append(index)
+                continue
+
+            steps, non_empty, keys = variant.dispatch
+            dispatcher = self.dispatchers.get((steps, non_empty))
+            if not dispatcher:
+                dispatcher = self.dispatchers[(steps, non_empty)] = VariantDispatcher(steps, non_empty)
+            for key in keys:
+                dispatcher.routes.setdefault(key, []).append(index)
+
+    def stampTypes(self, timestamp: str) -> None:
+        """Sets LAST-CHANGE of every type definition, types are shared by conversions of the plan"""
+        data_types_helper, types_helper, object_types_helper = self.types
+        for data_type in data_types_helper.data_types.values():
+            data_type.last_change = timestamp
+            for value in getattr(data_type, "values", None) or []:
+                value.last_change = timestamp
+
+        for spec_type in types_helper.spec_types.values():
+            spec_type.last_change = timestamp
+            for attribute in spec_type.spec_attributes:
+                attribute.last_change = timestamp
+
+        for spec_type in object_types_helper.spec_types.values():
+            spec_type.last_change = timestamp
+            for attribute in spec_type.attribute_definitions:
+                attribute.last_change = timestamp
+
+    def definitionIndex(self, attr: SpecAttributeDefinition) -> int:
+        """Index of object attribute definition in definitions, value tables refer to it"""
+        self.definitions.append(attr)
+        return len(self.definitions) - 1
+
+    def compileSelector(self, expression: str) -> CompiledSelector:
+        """Returns compiled selector, identical expressions share single instance"""
+        selector = self.selectors.get(expression)
+        if not selector:
+            selector = self.selectors[expression] = CompiledSelector(expression)
+
+        return selector
+
+    def dispatch(self, container: Any) -> Iterator[Tuple[VariantPlan, Any]]:
+        """Yields (variant, node) for every node of the container matched by variant, in variant order"""
+        if not self.dispatchers:
+            for variant in self.variants:
+                for node in variant.find(container):
+                    yield variant, node
+            return
+
+        ### Same node set as `$[?...]` filter, which iterates dict values and ignores scalars
+        if isinstance(container, dict):
+            nodes = list(container.values())
+        elif isinstance(container, list):
+            nodes = container
+        else:
+            nodes = []
+
+        buckets: List[List[Any]] = [[] for _ in self.variants]
+        for dispatcher in self.dispatchers.values():
+            routes = dispatcher.routes
+            for node in nodes:
+                for index in routes.get(dispatcher.key(node), ()):
+                    buckets[index].append(node)
+
+        for index in self.fallback_variants:
+            buckets[index] = self.variants[index].find(container)
+
+        for variant, bucket in zip(self.variants, buckets):
+            for node in bucket:
+                yield variant, node
+
+
+def compileMapping(config: ReqIFMappingSchema) -> MappingPlan:
+    """Compiles validated mapping into reusable plan"""
+    return MappingPlan(config)
@@ -0,0 +1,213 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, TextIO
+
+
+class PhaseMetrics(NamedTuple):
+    name: str
+    wall: float
+    cpu: float
+    memory_peak: int | None
+    counts: Dict[str, Any]
+
+
+class Progress(NamedTuple):
+    phase: str
+    done: int
+    unit: str
+    elapsed: float
+    rate: float
+    fraction: float | None
+    remaining: float | None
+    written: int | None
+
+
+class Observer:
+    '''
+    Receives conversion events, this base ignores all of them so the library prints nothing by default
+
+    Phase start and end events come in pairs and phases do not nest. Title is given to phases shown
+    by the command line, info lines describe the result of the running phase for a reader.
+    Progress of long phases is reported every progress_interval seconds, never when it is None.
+    '''
+    progress_interval: float | None = None
+
+    def phaseStart(self, name: str, title: str | None) -> None:
+        pass
+
+    def phaseEnd(self, metrics: PhaseMetrics) -> None:
+        pass
+
+    def info(self, text: str) -> None:
+        pass
+
+    def warning(self, text: str) -> None:
+        pass
+
+    def progress(self, progress: Progress) -> None:
+        pass
+
+
+class ObserverGroup(Observer):
+    '''Passes every event to all of its observers in order, progress is reported at the shortest interval of them'''
+    def __init__(self, *observers: Observer):
+        self.observers = observers
+        intervals = [observer.progress_interval for observer in observers if observer.progress_interval]
+        self.progress_interval = min(intervals) if intervals else None
+
+    def phaseStart(self, name: str, title: str | None) -> None:
+        for observer in self.observers:
+            observer.phaseStart(name, title)
+
+    def phaseEnd(self, metrics: PhaseMetrics) -> None:
+        for observer in self.observers:
+            observer.phaseEnd(metrics)
+
+    def info(self, text: str) -> None:
+        for observer in self.observers:
+            observer.info(text)
+
+    def warning(self, text: str) -> None:
+        for observer in self.observers:
+            observer.warning(text)
+
+    def progress(self, progress: Progress) -> None:
+        for observer in self.observers:
+            observer.progress(progress)
+
+
+class ConsoleObserver(Observer):
+    '''Progress of the command line, numbered titled phases, their info lines and progress of long phases'''
+    def __init__(self, stream: TextIO | None = None, progress_interval: float | None = None):
+        self.stream = stream
+        self.phases = 0
+        self.progress_interval = progress_interval
+
+    def phaseStart(self, name: str, title: str | None) -> None:
+        if title:
+            self.phases += 1
+            print(f"\n[Phase {self.phases}] {title}...", file=self.stream or sys.stderr)
+
+    def info(self, text: str) -> None:
+        print(f"      ✓ {text}", file=self.stream or sys.stderr)
+
+    def warning(self, text: str) -> None:
+        print(f"      ✗ {text}", file=self.stream or sys.stderr)
+
+    def progress(self, progress: Progress) -> None:
+        line = f"      … {progress.phase}: {progress.done:,} {progress.unit}"
+        if progress.fraction is not None:
+            line += f" ({progress.fraction:.0%})"
+        line += f", {progress.rate:,.0f} {progress.unit}/s"
+        if progress.written is not None:
+            line += f", {progress.written / 2**20:,.1f} MB written"
+        if progress.remaining is not None:
+            minutes, seconds = divmod(int(progress.remaining), 60)
+            line += f", about {minutes // 60}:{minutes % 60:02}:{seconds:02} left"
+        print(line, file=self.stream or sys.stderr)
+
+
+class MetricsRecorder(Observer):
+    '''
+    Collects metrics of every phase, see write
+
+    With trace_memory tracemalloc is started so phases report their peak of allocated python memory,
+    tracing slows conversion down noticeably. Without it the peak is only reported when tracing was started by the caller.
+    '''
+    def __init__(self, trace_memory: bool = False):
+        self.phases: List[PhaseMetrics] = []
+        self.warnings: List[str] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phaseEnd(self, metrics: PhaseMetrics) -> None:
+        self.phases.append(metrics)
+
+    def warning(self, text: str) -> None:
+        self.warnings.append(text)
+
+    def summary(self) -> Dict[str, Any]:
+        """Phases in order of their end with totals, seconds and bytes"""
+        peaks = [phase.memory_peak for phase in self.phases if phase.memory_peak is not None]
+        return {
+            "phases":   [phase._asdict() for phase in self.phases],
+            "total":    {
+                "wall":        sum(phase.wall for phase in self.phases),
+                "cpu":         sum(phase.cpu for phase in self.phases),
+                "memory_peak": max(peaks) if peaks else None,
+            },
+            "warnings": self.warnings,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+class ProgressMeter:
+    '''
+    Reports progress of a loop to observer at its progress interval
+
+    Loop compares its count with next and calls update only when it is reached, stride between checks
+    follows the measured rate so the clock is read a few times per interval whatever the loop speed.
+    Remaining time is estimated from the done fraction of the work given to update.
+    '''
+    def __init__(self, observer: Observer, phase: str, unit: str):
+        self.observer = observer
+        self.phase = phase
+        self.unit = unit
+        self.interval: float = observer.progress_interval
+        self.start = self.last = time.perf_counter()
+        self.stride = 16
+        self.next = self.stride
+
+    @staticmethod
+    def create(observer: Observer | None, phase: str, unit: str) -> "ProgressMeter | None":
+        """Meter of the phase, None when observer does not want progress"""
+        if observer is None or not observer.progress_interval:
+            return None
+        return ProgressMeter(observer, phase, unit)
+
+    def update(self, done: int, fraction: float | None = None, written: int | None = None) -> None:
+        now = time.perf_counter()
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.stride = max(1, int(rate * self.interval / 4))
+        self.next = done + self.stride
+
+        if now - self.last < self.interval:
+            return
+        self.last = now
+
+        if fraction is not None:
+            fraction = min(max(fraction, 0.0), 1.0)
+        remaining = elapsed * (1 - fraction) / fraction if fraction else None
+        self.observer.progress(Progress(self.phase, done, self.unit, elapsed, rate, fraction, remaining, written))
+
+
+_SILENT = Observer()
+
+@contextmanager
+def measure(observer: Observer | None, name: str, title: str | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    Reports phase to observer, body fills the yielded counts which come with the end event
+
+    Peak of traced memory is reset on start, so it covers this phase only while tracemalloc runs.
+    Failing phase sends no end event.
+    """
+    observer = observer or _SILENT
+    counts: Dict[str, Any] = {}
+    observer.phaseStart(name, title)
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+
+    yield counts
+
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    observer.phaseEnd(PhaseMetrics(name, wall, cpu, tracemalloc.get_traced_memory()[1] if tracing else None, counts))
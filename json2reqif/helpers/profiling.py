@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from json2reqif.converter import ReqIFConverterLib
+    from json2reqif.helpers.mapping_plan import MappingPlan
+
+
+class CostTable:
+    '''Call count and seconds per key, rows are sorted by cost'''
+    def __init__(self):
+        self.costs: Dict[Any, List[float]] = {}
+
+    def add(self, key: Any, seconds: float) -> None:
+        entry = self.costs.get(key)
+        if entry is None:
+            entry = self.costs[key] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def timed(self, key: Any, function: Callable) -> Callable:
+        """Function adding its duration to the key"""
+        clock = time.perf_counter
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(key, clock() - start)
+        return wrapper
+
+    def rows(self) -> List[Tuple[Any, int, float]]:
+        """(key, calls, seconds), most expensive first"""
+        return sorted(((key, int(calls), seconds) for key, (calls, seconds) in self.costs.items()), key=lambda row: -row[2])
+
+
+class Profiler:
+    '''
+    Profile of a conversion: cProfile statistics and cost of every mapping selector, variant match, variant and attribute
+
+    Selectors, variant filters and discriminator lookups of the plan and object building of the converter given to
+    instrument are timed, the plan is restored by stop. Variant match is timed per container for variants evaluating
+    their filter and per node for discriminator lookup shared by its variants. Variant build time covers building
+    its objects, attribute time covers its selector and conversion, so the tables overlap each other. Timing is done
+    in the converting process, parallel conversion is not supported.
+    '''
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.selectors = CostTable()
+        self.matches = CostTable()
+        self.variants = CostTable()
+        self.attributes = CostTable()
+        self.attribute_names: Dict[int, str] = {}
+        self._restore: List[Tuple[Any, str, Callable | None]] = []
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        """Stops profiling and removes timing from instrumented plans"""
+        self.profile.disable()
+        for owner, name, function in reversed(self._restore):
+            if function is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, function)
+        self._restore = []
+
+    def instrument(self, converter: ReqIFConverterLib) -> None:
+        """Times selectors and variant matching of the converter plan, objects built per variant and values added per attribute"""
+        if converter.jobs > 1:
+            raise Exception("Error: profiling requires conversion in single process, remove --jobs")
+
+        self.instrumentPlan(converter.plan)
+
+        converter.buildObject = self._timedBuild(converter.buildObject)
+        converter.appendValues = self._timedValues(converter.appendValues)
+
+    def instrumentPlan(self, plan: MappingPlan) -> None:
+        for expression, selector in plan.selectors.items():
+            self._wrap(selector, "find", self.selectors, expression)
+
+        for variant in plan.variants:
+            self._wrap(variant, "find", self.matches, f"{variant.type} filter")
+
+        for dispatcher in plan.dispatchers.values():
+            types = sorted({plan.variants[index].type for indices in dispatcher.routes.values() for index in indices})
+            self._wrap(dispatcher, "key", self.matches, f"{', '.join(types)} lookup")
+
+        for variant in plan.variants:
+            for definition, *_ in variant.builders:
+                self.attribute_names[definition] = f"{variant.type}.{plan.definitions[definition].long_name}"
+
+    def _wrap(self, owner: Any, name: str, costs: CostTable, key: str) -> None:
+        """Times method of the instance, methods already bound on the instance are restored as they were"""
+        self._restore.append((owner, name, owner.__dict__.get(name)))
+        setattr(owner, name, costs.timed(key, getattr(owner, name)))
+
+    def _timedBuild(self, buildObject: Callable) -> Callable:
+        clock = time.perf_counter
+        def wrapper(node, req_variant, *args, **kwargs):
+            start = clock()
+            try:
+                return buildObject(node, req_variant, *args, **kwargs)
+            finally:
+                self.variants.add(req_variant.type, clock() - start)
+        return wrapper
+
+    def _timedValues(self, appendValues: Callable) -> Callable:
+        clock = time.perf_counter
+        def wrapper(table, node, builders):
+            for builder in builders:
+                start = clock()
+                appendValues(table, node, (builder,))
+                self.attributes.add(builder[0], clock() - start)
+        return wrapper
+
+    def write(self, path: str) -> None:
+        """Raw cProfile statistics for pstats, snakeviz and similar tools"""
+        self.profile.dump_stats(path)
+
+    def report(self, stream: TextIO | None = None, limit: int = 25) -> None:
+        """Prints cost tables and the most expensive functions by cumulative time"""
+        stream = stream or sys.stdout
+
+        def table(title: str, rows: List[Tuple[str, int, float]]) -> None:
+            print(f"\n{title:<60} {'calls':>10} {'total ms':>10} {'µs/call':>10}", file=stream)
+            for key, calls, seconds in rows:
+                print(f"{key[:60]:<60} {calls:>10} {seconds * 1e3:>10.1f} {seconds / calls * 1e6:>10.1f}", file=stream)
+
+        table("Selector", self.selectors.rows())
+        table("Variant match", self.matches.rows())
+        table("Variant build", self.variants.rows())
+        table("Attribute", [(self.attribute_names.get(key, str(key)), calls, seconds) for key, calls, seconds in self.attributes.rows()])
+
+        buffer = io.StringIO()
+        pstats.Stats(self.profile, stream=buffer).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        print(f"\n{buffer.getvalue().strip()}", file=stream)
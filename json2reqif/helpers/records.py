@@ -0,0 +1,102 @@
+from array import array
+from typing import List, Tuple
+
+from reqif.models.reqif_spec_object import ReqIFSpecObject, SpecObjectAttribute
+from reqif.models.reqif_spec_object_type import SpecAttributeDefinition
+from reqif.models.reqif_types import SpecObjectAttributeType
+from reqif.parsers.spec_object_parser import SpecObjectParser
+
+
+class ValueTable:
+    '''
+    Attribute values of converted objects in flat arrays instead of one model object per attribute
+
+    Every entry is the index of its attribute definition and the value: plain string, identifier of the
+    enumeration value or converted XHTML, which XhtmlPool may fill in later. Object refers to a contiguous
+    range of entries, definitions are the ones indexed by the mapping plan, see MappingPlan.definitions.
+    '''
+    __slots__ = ("definitions", "kinds", "values")
+
+    def __init__(self, definitions: List[SpecAttributeDefinition]):
+        self.definitions = definitions
+        self.kinds = array("H")
+        self.values: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, definition: int, value: str) -> int:
+        """Adds value of the definition, returns its index"""
+        self.kinds.append(definition)
+        self.values.append(value)
+        return len(self.values) - 1
+
+
+class ObjectRecord:
+    '''SPEC-OBJECT of a node, materialized into reqif model only when written'''
+    __slots__ = ("identifier", "description", "spec_object_type", "last_change", "table", "start", "end", "leaf")
+
+    def __init__(self, identifier: str, description: str, spec_object_type: str, last_change: str,
+                 table: ValueTable, start: int, end: int, leaf: bool):
+        self.identifier = identifier
+        self.description = description
+        self.spec_object_type = spec_object_type
+        self.last_change = last_change
+        self.table = table
+        self.start = start
+        self.end = end
+        self.leaf = leaf
+
+    def materialize(self) -> ReqIFSpecObject:
+        """Equivalent reqif model with its attribute values"""
+        table = self.table
+        attributes: List[SpecObjectAttribute] = []
+        for index in range(self.start, self.end):
+            definition = table.definitions[table.kinds[index]]
+            attribute_type = definition.attribute_type
+            value = table.values[index]
+            attributes.append(SpecObjectAttribute(
+                attribute_type = attribute_type,
+                value          = [value] if attribute_type == SpecObjectAttributeType.ENUMERATION else value,
+                definition_ref = definition.identifier,
+            ))
+
+        return ReqIFSpecObject(
+            identifier       = self.identifier,
+            attributes       = attributes,
+            description      = self.description,
+            spec_object_type = self.spec_object_type,
+            last_change      = self.last_change,
+        )
+
+    def render(self) -> str:
+        """SPEC-OBJECT xml, same as SpecObjectParser output of the model"""
+        return SpecObjectParser.unparse(self.materialize())
+
+
+class HierarchyRecord:
+    '''SPEC-HIERARCHY entry with the fields read by ReqIF writers, childless entry shares an empty tuple'''
+    __slots__ = ("identifier", "spec_object", "long_name", "last_change", "level", "children")
+
+    editable = False
+    is_table_internal = False
+    is_self_closed = True
+    ref_then_children_order = True
+    xml_node = None
+
+    def __init__(self, identifier: str, spec_object: str, long_name: str, last_change: str, level: int):
+        self.identifier = identifier
+        self.spec_object = spec_object
+        self.long_name = long_name
+        self.last_change = last_change
+        self.level = level
+        self.children: List["HierarchyRecord"] | Tuple = ()
+
+    def add_child(self, child: "HierarchyRecord") -> None:
+        if self.children:
+            self.children.append(child)
+        else:
+            self.children = [child]
+
+    def calculate_base_level(self) -> int:
+        return 12 + (self.level - 1) * 4
@@ -0,0 +1,232 @@
+import io
+import mimetypes
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Set, TextIO
+
+from reqif.helpers.lxml import lxml_escape_for_html
+from reqif.models.reqif_reqif_header import ReqIFReqIFHeader
+from reqif.models.reqif_spec_hierarchy import ReqIFSpecHierarchy
+from reqif.models.reqif_spec_object import ReqIFSpecObject
+from reqif.models.reqif_spec_object_type import ReqIFSpecObjectType
+from reqif.models.reqif_specification import ReqIFSpecification
+from reqif.models.reqif_specification_type import ReqIFSpecificationType
+from reqif.parsers.attribute_value_parser import AttributeValueParser
+from reqif.parsers.data_type_parser import DataTypeParser
+from reqif.parsers.header_parser import ReqIFHeaderParser
+from reqif.parsers.spec_object_parser import SpecObjectParser
+from reqif.parsers.spec_types.spec_object_type_parser import SpecObjectTypeParser
+from reqif.parsers.spec_types.specification_type_parser import SpecificationTypeParser
+from reqif.parsers.specification_parser import ReqIFSpecificationParser
+from reqif.reqif_bundle import ReqIFBundle
+from reqif.unparser import ReqIFUnparser
+
+from json2reqif.helpers.incremental import RenderedSpecObject
+from json2reqif.helpers.metrics import Observer, ProgressMeter
+from json2reqif.helpers.records import HierarchyRecord, ObjectRecord
+from json2reqif.helpers.xhtml import PayloadStore, findPlaceholders
+
+
+class ReqIFStreamWriter:
+    '''
+    Writes ReqIF section by section straight to the file handle
+
+    Output is byte compatible with ReqIFUnparser, but no element is kept as a string longer than needed
+    and SPEC-HIERARCHY of any depth is written without recursion. Image payloads lifted out of rich text
+    are written straight from the payload store into attribute values. Progress of SPEC-OBJECTs is reported to observer.
+    Payload keys of written values are collected to referenced when given.
+    '''
+    def __init__(self, output: TextIO, payloads: PayloadStore | None = None, paths: Dict[str, str] | None = None, observer: Observer | None = None,
+                 referenced: Set[str] | None = None):
+        self.output = output
+        self.payloads = payloads
+        self.paths = paths
+        self.observer = observer
+        self.referenced = referenced
+
+    def write(self, bundle: ReqIFBundle) -> None:
+        """Writes complete bundle"""
+        content = bundle.core_content.req_if_content if bundle.core_content else None
+
+        self.writeStart(bundle.namespace_info, bundle.req_if_header)
+
+        if content:
+            if content.data_types is not None:
+                self.writeDataTypes(content.data_types)
+            if content.spec_types is not None:
+                self.writeSpecTypes(content.spec_types)
+
+            if content.spec_objects is not None:
+                self.output.write("      <SPEC-OBJECTS>\n")
+                meter = ProgressMeter.create(self.observer, "write", "objects")
+                total = len(content.spec_objects)
+                for index, spec_object in enumerate(content.spec_objects):
+                    if meter is not None and index >= meter.next:
+                        meter.update(index, index / total, self.written())
+                    self.writeSpecObject(spec_object)
+                self.output.write("      </SPEC-OBJECTS>\n")
+
+            if content.specifications is not None:
+                self.output.write("      <SPECIFICATIONS>\n")
+                for specification in content.specifications:
+                    self.writeSpecification(specification)
+                self.output.write("      </SPECIFICATIONS>\n")
+
+        self.writeEnd()
+
+    def written(self) -> int | None:
+        """Bytes written so far, None when the output does not tell"""
+        try:
+            return self.output.tell()
+        except (OSError, ValueError):
+            return None
+
+    def writeStart(self, namespace_info, header: ReqIFReqIFHeader | None) -> None:
+        """Prolog, REQ-IF root, THE-HEADER and opening of REQ-IF-CONTENT"""
+        self.output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.output.write(ReqIFUnparser.unparse_namespace_info(namespace_info))
+        if header is not None:
+            self.output.write(ReqIFHeaderParser.unparse(header))
+        self.output.write("  <CORE-CONTENT>\n")
+        self.output.write("    <REQ-IF-CONTENT>\n")
+
+    def writeDataTypes(self, data_types: List[Any]) -> None:
+        self.output.write("      <DATATYPES>\n")
+        for data_type in data_types:
+            self.output.write(DataTypeParser.unparse(data_type))
+        self.output.write("      </DATATYPES>\n")
+
+    def writeSpecTypes(self, spec_types: List[Any]) -> None:
+        self.output.write("      <SPEC-TYPES>\n")
+        for spec_type in spec_types:
+            if isinstance(spec_type, ReqIFSpecObjectType):
+                self.output.write(SpecObjectTypeParser.unparse(spec_type))
+            elif isinstance(spec_type, ReqIFSpecificationType):
+                self.output.write(SpecificationTypeParser.unparse(spec_type))
+        self.output.write("      </SPEC-TYPES>\n")
+
+    def writeSpecObject(self, spec_object: ReqIFSpecObject | ObjectRecord | RenderedSpecObject) -> None:
+        """Model is written by SpecObjectParser, records of the converter render themselves"""
+        if isinstance(spec_object, ReqIFSpecObject):
+            self.writeValues(SpecObjectParser.unparse(spec_object))
+        else:
+            self.writeValues(spec_object.render())
+
+    def writeSpecification(self, specification: ReqIFSpecification) -> None:
+        """Same layout as ReqIFSpecificationParser, hierarchy is written entry by entry"""
+        output = "        <SPECIFICATION"
+        if specification.description is not None:
+            output += f' DESC="{lxml_escape_for_html(specification.description)}"'
+        output += f' IDENTIFIER="{specification.identifier}"'
+        if specification.last_change is not None:
+            output += f' LAST-CHANGE="{specification.last_change}"'
+        if specification.long_name is not None:
+            output += f' LONG-NAME="{lxml_escape_for_html(specification.long_name)}"'
+        output += ">\n"
+        self.output.write(output)
+
+        if specification.specification_type:
+            self.output.write(ReqIFSpecificationParser._unparse_specification_type(specification))
+
+        if specification.children is not None:
+            self.output.write("          <CHILDREN>\n")
+            self.writeHierarchy(specification.children)
+            self.output.write("          </CHILDREN>\n")
+
+        self.writeValues(AttributeValueParser.unparse_attribute_values(specification.values))
+        self.output.write("        </SPECIFICATION>\n")
+
+    def writeHierarchy(self, hierarchies: List[ReqIFSpecHierarchy | HierarchyRecord]) -> None:
+        """Same layout as ReqIFSpecHierarchyParser, explicit stack of entries and pending closing tags"""
+        stack: List[ReqIFSpecHierarchy | str] = [*reversed(hierarchies)]
+
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                self.output.write(item)
+                continue
+
+            hierarchy = item
+            indent = " " * hierarchy.calculate_base_level()
+
+            output = f'{indent}<SPEC-HIERARCHY IDENTIFIER="{hierarchy.identifier}"'
+            if hierarchy.editable is not None:
+                output += f' IS-EDITABLE="{"true" if hierarchy.editable else "false"}"'
+            if hierarchy.is_table_internal is not None:
+                output += f' IS-TABLE-INTERNAL="{"true" if hierarchy.is_table_internal else "false"}"'
+            if hierarchy.last_change:
+                output += f' LAST-CHANGE="{hierarchy.last_change}"'
+            if hierarchy.long_name:
+                output += f' LONG-NAME="{hierarchy.long_name}"'
+            output += ">\n"
+
+            reference = (
+                f"{indent}  <OBJECT>\n"
+                f"{indent}    <SPEC-OBJECT-REF>{hierarchy.spec_object}</SPEC-OBJECT-REF>\n"
+                f"{indent}  </OBJECT>\n"
+            )
+
+            # Pending output in reverse order: closing tag, trailing part, children, leading part
+            pending: List[ReqIFSpecHierarchy | str] = [f"{indent}</SPEC-HIERARCHY>\n"]
+            children = hierarchy.children
+            if children is None:
+                output += reference
+            elif len(children) == 0 and hierarchy.is_self_closed:
+                if hierarchy.ref_then_children_order:
+                    output += reference + f"{indent}  <CHILDREN/>\n"
+                else:
+                    output += f"{indent}  <CHILDREN/>\n" + reference
+            elif hierarchy.ref_then_children_order:
+                output += reference + f"{indent}  <CHILDREN>\n"
+                pending.append(f"{indent}  </CHILDREN>\n")
+                pending.extend(reversed(children))
+            else:
+                output += f"{indent}  <CHILDREN>\n"
+                pending.append(f"{indent}  </CHILDREN>\n" + reference)
+                pending.extend(reversed(children))
+
+            self.output.write(output)
+            stack.extend(pending)
+
+    def writeValues(self, text: str) -> None:
+        """Writes attribute values, splicing lifted payloads back"""
+        if self.referenced is not None:
+            self.referenced.update(findPlaceholders(text))
+        if self.payloads is not None:
+            self.payloads.write(text, self.output, self.paths)
+        else:
+            self.output.write(text)
+
+    def writeEnd(self) -> None:
+        self.output.write("    </REQ-IF-CONTENT>\n")
+        self.output.write("  </CORE-CONTENT>\n")
+        self.output.write("</REQ-IF>\n")
+
+
+def writeArchive(bundle: ReqIFBundle, output_path: str, payloads: PayloadStore, observer: Observer | None = None) -> None:
+    """
+    Writes .reqifz container: ReqIF document and every image it refers to as separate member
+
+    ReqIF document is written section by section first and refers to images by relative path, so only images
+    referenced by its values are decoded into members after it. Payloads the store keeps for other documents stay out.
+    """
+    date_time = time.localtime()[:6]
+    paths = {key: f"files/{key}{mimetypes.guess_extension(payloads.types[key]) or '.bin'}" for key in payloads.payloads}
+    referenced: Set[str] = set()
+
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        info = zipfile.ZipInfo(f"{Path(output_path).stem}.reqif", date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+
+        with archive.open(info, "w", force_zip64=True) as member:
+            with io.TextIOWrapper(member, encoding="UTF-8") as output:
+                ReqIFStreamWriter(output, payloads, paths, observer, referenced).write(bundle)
+
+        for key in sorted(referenced & paths.keys()):
+            info = zipfile.ZipInfo(paths[key], date_time)
+            info.compress_type = zipfile.ZIP_STORED
+
+            with archive.open(info, "w", force_zip64=len(payloads.payloads[key]) > 1 << 31) as member:
+                for part in payloads.decoded(key):
+                    member.write(part)
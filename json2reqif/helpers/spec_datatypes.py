@@ -1,5 +1,5 @@
 
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from reqif.models.reqif_data_type import (
       ReqIFDataTypeDefinitionInteger,
@@ -14,10 +14,81 @@ from json2reqif.helpers import (
     _get_timestamp
 )
 
+def _enumPolicy(rest) -> Tuple[str, str | None]:
+    """Unknown value policy and default of enumeration attribute mapping, error unless declared"""
+    policy = getattr(rest, "onUnknown", None)
+    return (policy.value if policy else "error"), getattr(rest, "defaultValue", None)
+
+
+class EnumIndex:
+    '''
+    Name to identifier index of enumeration datatype, with the policy for names missing from it
+
+    error reports unknown name, skip leaves the attribute out, default maps it to the default value and
+    extend adds it to the datatype. Added values are derived from the datatype and name only, so every
+    process extending the same enumeration with the same name gives the same identifier.
+    '''
+    def __init__(self, data_type: ReqIFDataTypeDefinitionEnumeration, policy: str = "error", default: str | None = None):
+        self.data_type = data_type
+        self.policy = policy
+        self.default = default
+        self.identifiers: Dict[str, str] = {value.long_name: value.identifier for value in data_type.values}
+        self.declared = len(data_type.values)
+
+        if policy == "default" and default not in self.identifiers:
+            raise Exception(f"Error: default '{default}' of enumeration {data_type.long_name} is not one of its values")
+
+    def lookup(self, name: str) -> str | None:
+        """Identifier of the value, None when unknown value is skipped"""
+        identifier = self.identifiers.get(name)
+        if identifier is not None:
+            return identifier
+
+        if self.policy == "skip":
+            return None
+        if self.policy == "default":
+            return self.identifiers[self.default]
+        if self.policy == "extend":
+            return self.extend(name)
+        raise Exception(f"Error: '{name}' is not a value of enumeration {self.data_type.long_name}")
+
+    def strict(self, name: str) -> str:
+        """Identifier of declared value regardless of the policy"""
+        identifier = self.identifiers.get(name)
+        if identifier is None:
+            raise Exception(f"Error: '{name}' is not a value of enumeration {self.data_type.long_name}")
+        return identifier
+
+    def extend(self, name: str) -> str:
+        """Adds value of the name with next free key"""
+        values = self.data_type.values
+        value = ReqIFEnumValue(
+            identifier    = _gen_id("EV", f"{self.data_type.long_name}/{name}"),
+            last_change   = self.data_type.last_change,
+            key           = str(max((int(value.key) for value in values), default=-1) + 1),
+            long_name     = name,
+            other_content = "",
+        )
+        values.append(value)
+        self.identifiers[name] = value.identifier
+        return value.identifier
+
+    def extended(self) -> List[str]:
+        """Names added by extend"""
+        return [value.long_name for value in self.data_type.values[self.declared:]]
+
+    def reset(self) -> None:
+        """Drops values added by extend"""
+        for value in self.data_type.values[self.declared:]:
+            del self.identifiers[value.long_name]
+        del self.data_type.values[self.declared:]
+
+
 class SpecDataTypesHelper:
     def __init__(self):
         self.data_types: Dict[str, ReqIFDataTypeDefinitionInteger|ReqIFDataTypeDefinitionString|ReqIFDataTypeDefinitionXHTML|ReqIFDataTypeDefinitionEnumeration] = {}
         self.data_typed_by_id: Dict[str, ReqIFDataTypeDefinitionInteger|ReqIFDataTypeDefinitionString|ReqIFDataTypeDefinitionXHTML|ReqIFDataTypeDefinitionEnumeration] = {}
+        self.enum_indices: Dict[str, EnumIndex] = {}
         self.GENERATORS = {
             "INTEGER": self.createIntegerType,
             "STRING": self.createStringType,
@@ -31,9 +102,37 @@ class SpecDataTypesHelper:
             gen_type = self.GENERATORS[type](subType, rest)
             self.data_types[t] = gen_type
             self.data_typed_by_id[gen_type.identifier] = gen_type
+            if type == "ENUMERATION":
+                self.enum_indices[gen_type.identifier] = EnumIndex(gen_type, *_enumPolicy(rest))
+        elif type == "ENUMERATION":
+            index = self.enum_indices[self.data_types[t].identifier]
+            if (index.policy, index.default) != _enumPolicy(rest):
+                raise Exception(f"Error: attributes sharing enumeration {index.data_type.long_name} declare different onUnknown or defaultValue")
 
         return self.data_types[t]
 
+    def enumValue(self, datatype_id: str, name: str) -> str | None:
+        """Identifier of the enumeration value by its name, see EnumIndex"""
+        return self.enum_indices[datatype_id].lookup(name)
+
+    def extendedValues(self) -> Dict[str, List[str]]:
+        """Names added to enumerations by extend policy, by datatype identifier"""
+        return {datatype_id: index.extended() for datatype_id, index in self.enum_indices.items() if index.extended()}
+
+    def extendValues(self, extended: Dict[str, List[str]]) -> None:
+        """Adds names extended by another conversion of the same mapping, known ones are kept"""
+        for datatype_id, names in extended.items():
+            index = self.enum_indices.get(datatype_id)
+            if index is None:
+                continue
+            for name in names:
+                if name not in index.identifiers:
+                    index.extend(name)
+
+    def resetExtensions(self) -> None:
+        for index in self.enum_indices.values():
+            index.reset()
+
     def createIntegerType(self, subType: str, rest):
         type = f"INTEGER_{subType}"
         return ReqIFDataTypeDefinitionInteger(
@@ -78,4 +177,4 @@ class SpecDataTypesHelper:
             long_name   = type,
             last_change = _get_timestamp(),
             values      = vals
-        )
\ No newline at end of file
+        )
@@ -1,11 +1,12 @@
-from typing import Dict
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict
 from reqif.models.reqif_spec_object_type import (
     ReqIFSpecObjectType,
     SpecAttributeDefinition
 )
 from reqif.models.reqif_types import SpecObjectAttributeType
 
-from json2reqif._types import ReqIFMappingRequirement
 from json2reqif.helpers.spec_datatypes import SpecDataTypesHelper
 
 from json2reqif.helpers import (
@@ -13,6 +14,9 @@ from json2reqif.helpers import (
     _get_timestamp
 )
 
+if TYPE_CHECKING:
+    from json2reqif._types import ReqIFMappingRequirement
+
 class SpecObjectTypesHelper:
     '''Helper for the specification object types operations'''
     def __init__(self, object: ReqIFMappingRequirement, helper: SpecDataTypesHelper):
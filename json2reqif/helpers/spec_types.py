@@ -1,16 +1,20 @@
-from typing import Dict
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict
 
 from reqif.models.reqif_spec_object_type import SpecAttributeDefinition
 from reqif.models.reqif_specification_type import ReqIFSpecificationType
 from reqif.models.reqif_types import SpecObjectAttributeType
 
-from json2reqif._types import ReqIFMappingSpecification
 from json2reqif.helpers.spec_datatypes import SpecDataTypesHelper
 from json2reqif.helpers import (
     _gen_id,
     _get_timestamp
 )
 
+if TYPE_CHECKING:
+    from json2reqif._types import ReqIFMappingSpecification
+
 class SpecTypesHelper:
     '''Helper for the specification types operations'''
     def __init__(self, spec: ReqIFMappingSpecification, helper: SpecDataTypesHelper):
@@ -0,0 +1,92 @@
+from enum import Enum
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+
+class StreamEvent(Enum):
+    Open = 0
+    Close = 1
+    Skip = 2
+
+
+class _NodeFrame:
+    '''Requirement node being read, holds everything but its children'''
+    __slots__ = ("node", "key", "depth", "in_children")
+
+    def __init__(self, depth: int):
+        self.node: Dict[str, Any] = {}
+        self.key: str | None = None
+        self.depth = depth
+        self.in_children = False
+
+
+def readNodes(source: BinaryIO, children_key: str) -> Iterator[Tuple[StreamEvent, Any, int]]:
+    """
+    Reads json document incrementally and reports requirement nodes of the children_key hierarchy
+
+    Yields (Open, None, depth) when node starts, (Close, node, depth) when its subtree is complete and
+    (Skip, None, depth) for non-object entries of a children array. Closed node holds every field except
+    children, which is an empty list to be filled by the consumer when present in the document.
+    Root object is reported as depth 0, memory is proportional to the depth and to a single node size.
+    """
+    try:
+        import ijson
+    except ImportError:
+        raise Exception("Error: streaming input requires ijson package, install it with `pip install ijson`")
+
+    stack: List[_NodeFrame] = []
+    builder = None
+    builder_depth = 0
+
+    for event, value in ijson.basic_parse(source, use_float=True):
+        ### Plain value of the node, possibly nested, built as a whole
+        if builder is not None:
+            builder.event(event, value)
+            if event == "start_map" or event == "start_array":
+                builder_depth += 1
+            elif event == "end_map" or event == "end_array":
+                builder_depth -= 1
+
+            if builder_depth == 0:
+                top = stack[-1]
+                if top.in_children:
+                    yield StreamEvent.Skip, None, top.depth + 1
+                else:
+                    top.node[top.key] = builder.value
+                builder = None
+            continue
+
+        if not stack:
+            if event != "start_map":
+                raise Exception("Error: streaming input root must be an object")
+            stack.append(_NodeFrame(0))
+            yield StreamEvent.Open, None, 0
+            continue
+
+        top = stack[-1]
+
+        if top.in_children:
+            if event == "start_map":
+                stack.append(_NodeFrame(top.depth + 1))
+                yield StreamEvent.Open, None, top.depth + 1
+            elif event == "end_array":
+                top.in_children = False
+            elif event == "start_array":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                builder_depth = 1
+            else:
+                yield StreamEvent.Skip, None, top.depth + 1
+        elif event == "map_key":
+            top.key = value
+        elif event == "end_map":
+            stack.pop()
+            yield StreamEvent.Close, top.node, top.depth
+        elif event == "start_array" and top.key == children_key:
+            top.node[children_key] = []
+            top.in_children = True
+        elif event == "start_map" or event == "start_array":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            builder_depth = 1
+        else:
+            top.node[top.key] = value
@@ -0,0 +1,317 @@
+"""
+Rich text sanitizer for XHTML attribute values
+
+Random rich text issues break xml validator, rules are applied in a single pass over the markup:
+tags are visited one by one and only the rules registered for the tag name are tried, so the value
+is copied once instead of once per rule. Markup is expected to use "<" only to open tags.
+"""
+
+import base64
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List, TextIO, Tuple
+
+from reqif.helpers.lxml import lxml_convert_to_reqif_ns_xhtml_string
+
+# Rules on the opening of any tag
+_STRIKE = re.compile(r'(</?)s(?:trike)?(\s+|>)')
+_META   = re.compile(r'<(meta|map)[^>]+>')
+_FONT   = re.compile(r'<(?:font)\s*[^>]+>')
+_IMG    = re.compile(r'(<(?:img\s+)[^>]+?src([^\s>]+)[^>]*>)')
+_NAME   = re.compile(r'<(\w+)\s')
+_MIME   = re.compile(r'(?:.*?data:)([^;]+)')
+
+_EMPTY_TBODY = "<tbody><tr><td/></tr></tbody>"
+
+# Base64 payload of data URI, padding stays in place so no rule can see a changed attribute ending
+_DATA_URI    = re.compile(r'(data:[^,\s"\'<>]*;base64,)([A-Za-z0-9+/]{256,})')
+_PLACEHOLDER = re.compile(r'@([0-9a-f]{32})@')
+_EXTERNAL    = re.compile(r'data:[^;,"\s<>]*;base64,@([0-9a-f]{32})@=*')
+
+# Attribute rules in order of application as (tags, needle, pattern)
+_ATTRIBUTE_RULES: List[Tuple[Tuple[str, ...], str, str]] = [
+    (("a",),                                      "tabindex=",    r'(<(?:a)\s+[^>]*?)tabindex=[^\s>]+'),
+    (("a", "p", "span", "table"),                 "align=",       r'(<(?:a|p|span|table)\s+[^>]*?)align=[^\s>]+'),
+    (("a", "p", "span", "table"),                 "lang=",        r'(<(?:a|p|span|table)\s+[^>]*?)lang=[^\s>]+'),
+    (("a", "p", "span", "table"),                 "info=",        r'(<(?:a|p|span|table)\s+[^>]*?)info=[^\s>]+'),
+    (("a", "p", "span", "table"),                 "target=",      r'(<(?:a|p|span|table)\s+[^>]*?)target=[^\s>]+'),
+    (("a", "p", "span", "table"),                 "data-",        r'(<(?:a|p|span|table)\s+[^>]*?)(data-[^=]+=[^\s>]+\s*)+'),
+    (("a", "p", "table", "tr", "td", "th", "del"), "nativestyle=", r'(<(?:a|p|table|tr|td|th|del)\s+[^>]*?)nativestyle=[^\s>]+'),
+    (("table", "tr", "td", "th"),                 "id=",          r'(<(?:table|tr|td|th)\s+[^>]*?)id=[^\s>]+'),
+    (("td", "th"),                                "width=",       r'(<(?:td|th)\s+[^>]*?)width=[^\s>]+'),
+]
+
+def _compileAttributeRules() -> Dict[str, List[Tuple[str, re.Pattern]]]:
+    """Rules grouped by tag name, compiled once per process"""
+    rules: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+    for tags, needle, pattern in _ATTRIBUTE_RULES:
+        compiled = re.compile(pattern)
+        for tag in tags:
+            rules.setdefault(tag, []).append((needle, compiled))
+    return rules
+
+_TAG_RULES = _compileAttributeRules()
+
+
+def _img2obj(img: re.Match) -> str:
+    # img is not supported by xhtml schema, replace with object and hope for the best
+    m = _MIME.match(img.group(2))
+    return f'<object type="{m.group(1) if m else ""}" data{img.group(2)} ></object>'
+
+def _cleanTag(tag: str) -> str:
+    """Attribute rules and img replacement for a single tag"""
+    name = _NAME.match(tag)
+    if name:
+        for needle, pattern in _TAG_RULES.get(name.group(1), ()):
+            if needle in tag:
+                tag = pattern.sub("\\1", tag)
+
+        if name.group(1) == "img":
+            tag = _IMG.sub(_img2obj, tag)
+
+    return tag
+
+def _pieces(val: str):
+    """Splits markup into tag and text pieces, tag runs from "<" to the first ">" """
+    start = val.find("<")
+    if start != 0:
+        yield False, val if start < 0 else val[:start]
+    if start < 0:
+        return
+
+    while start >= 0:
+        end = val.find("<", start + 1)
+        chunk = val[start:end] if end >= 0 else val[start:]
+        close = chunk.find(">")
+        if close < 0 or close == len(chunk) - 1:
+            yield True, chunk
+        else:
+            yield True, chunk[:close + 1]
+            yield False, chunk[close + 1:]
+        start = end
+
+class _Output:
+    '''Collects sanitized pieces, fills empty table body right after thead'''
+    __slots__ = ("parts", "tail", "pending")
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.tail = ""
+        self.pending: List[str] | None = None
+
+    def emit(self, piece: str) -> None:
+        if not piece:
+            return
+
+        if self.tail.endswith("/thead>"):
+            if piece.isspace():
+                if self.pending is None:
+                    self.pending = []
+                self.pending.append(piece)
+                return
+
+            if piece.startswith("</table"):
+                self.pending = None
+                self._append(_EMPTY_TBODY)
+
+        if self.pending is not None:
+            for pending in self.pending:
+                self._append(pending)
+            self.pending = None
+
+        self._append(piece)
+
+    def _append(self, piece: str) -> None:
+        self.parts.append(piece)
+        self.tail = piece[-7:] if len(piece) >= 7 else (self.tail + piece)[-7:]
+
+    def value(self) -> str:
+        if self.pending is not None:
+            self.parts.extend(self.pending)
+        return "".join(self.parts)
+
+
+def sanitizeXhtml(val: str) -> str:
+    """
+    Applies rich text fixes in a single pass:
+    strike to del, meta/map/font removal, attribute stripping, empty tbody after thead, img to object
+    """
+    out = _Output()
+    emit = out.emit
+
+    # Pending <font ...> removal: font tag and content seen so far
+    font: List[Tuple[bool, str]] | None = None
+    font_length = 0
+
+    for is_tag, piece in _pieces(val):
+        if is_tag:
+            if piece.startswith("<s") or piece.startswith("</s"):
+                piece = _STRIKE.sub("\\1del\\2", piece, count=1)
+            elif piece.startswith("<m") and _META.fullmatch(piece):
+                continue
+
+        if font is not None:
+            # Font is removed up to the first </font> after at least one character on the same line
+            if is_tag and piece == "</font>" and font_length:
+                font = None
+                continue
+            if "\n" not in piece:
+                font.append((is_tag, piece))
+                font_length += len(piece)
+                continue
+
+            for font_is_tag, font_piece in font:
+                emit(_cleanTag(font_piece) if font_is_tag else font_piece)
+            font = None
+
+        if is_tag and piece.startswith("<font") and _FONT.fullmatch(piece):
+            font = [(is_tag, piece)]
+            font_length = 0
+            continue
+
+        emit(_cleanTag(piece) if is_tag else piece)
+
+    if font is not None:
+        for font_is_tag, font_piece in font:
+            emit(_cleanTag(font_piece) if font_is_tag else font_piece)
+
+    return out.value()
+
+def convertXhtml(val: str) -> str:
+    """Sanitizes rich text and converts it into xhtml namespaced ReqIF value"""
+    return lxml_convert_to_reqif_ns_xhtml_string(f"<div>{sanitizeXhtml(val)}</div>", False)
+
+
+def findPlaceholders(text: str) -> List[str]:
+    """Payload keys referred from the text"""
+    return sorted(set(_PLACEHOLDER.findall(text)))
+
+
+class PayloadStore:
+    '''
+    Base64 payloads of data URIs lifted out of rich text
+
+    Payload is replaced with a placeholder before sanitizing, so sanitizer and lxml only see the markup,
+    and is spliced back when xml is written. Identical payloads are kept once.
+    '''
+    def __init__(self):
+        self.payloads: Dict[str, str] = {}
+        self.types: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def lift(self, val: str) -> str:
+        """Value with data URI payloads replaced by placeholders"""
+        if "base64," not in val:
+            return val
+        return _DATA_URI.sub(self._lift, val)
+
+    def _lift(self, m: re.Match) -> str:
+        payload = m.group(2)
+        key = hashlib.blake2b(payload.encode("ascii"), digest_size=16).hexdigest()
+        if key not in self.payloads:
+            self.payloads[key] = payload
+            self.types[key] = m.group(1)[5:-8]
+        return f"{m.group(1)}@{key}@"
+
+    def splice(self, text: str) -> str:
+        """Text with placeholders replaced by payloads"""
+        if not self.payloads:
+            return text
+        return _PLACEHOLDER.sub(lambda m: self.payloads.get(m.group(1), m.group(0)), text)
+
+    def write(self, text: str, output: TextIO, paths: Dict[str, str] | None = None) -> None:
+        """Writes text with payloads spliced straight into output, or whole data URIs replaced with paths when given"""
+        if not self.payloads or "@" not in text:
+            output.write(text)
+            return
+
+        start = 0
+        for m in (_EXTERNAL if paths is not None else _PLACEHOLDER).finditer(text):
+            payload = paths.get(m.group(1)) if paths is not None else self.payloads.get(m.group(1))
+            if payload is not None:
+                output.write(text[start:m.start()])
+                output.write(payload)
+                start = m.end()
+        output.write(text[start:])
+
+    def decoded(self, key: str, chunk: int = 1 << 20) -> Iterator[bytes]:
+        """Payload decoded piece by piece, padding is restored as it stays out of the lifted part"""
+        payload = self.payloads[key]
+        chunk -= chunk % 4
+        for start in range(0, len(payload), chunk):
+            part = payload[start:start + chunk]
+            yield base64.b64decode(part + "=" * (-len(part) % 4))
+
+    def clear(self) -> None:
+        self.payloads.clear()
+        self.types.clear()
+
+
+class XhtmlCache:
+    '''
+    Bounded LRU cache of converted XHTML values, keyed by hash of the raw value
+
+    One instance is shared by every attribute of a conversion, pass the same instance to several
+    conversions to share it across documents. Size is the number of kept values, 0 disables caching.
+    Image payloads are kept aside in payloads store, output must be written with it, see PayloadStore.
+    Payloads of shared instance accumulate over documents unless dropPayloads is called between them.
+    '''
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self.payloads = PayloadStore()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def convert(self, val: str) -> str:
+        """Converted value, from cache when the same raw value was converted before"""
+        if self.size <= 0:
+            self.misses += 1
+            return convertXhtml(self.payloads.lift(val))
+
+        key = self.key(val)
+        converted = self.get(key)
+        if converted is not None:
+            self.hits += 1
+            return converted
+
+        self.misses += 1
+        converted = convertXhtml(self.payloads.lift(val))
+        self.put(key, converted)
+        return converted
+
+    def key(self, val: str) -> bytes:
+        return hashlib.blake2b(val.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> str | None:
+        """Cached value marked as recently used, counters are left to the caller"""
+        converted = self._entries.get(key)
+        if converted is not None:
+            self._entries.move_to_end(key)
+        return converted
+
+    def put(self, key: bytes, converted: str) -> None:
+        if self.size <= 0:
+            return
+        self._entries[key] = converted
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def dropPayloads(self) -> None:
+        """Starts empty payloads store, cached values referring to payloads of the former one are dropped"""
+        self.payloads = PayloadStore()
+        for key in [key for key, converted in self._entries.items() if _PLACEHOLDER.search(converted)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Drops cached values and payloads and resets counters"""
+        self._entries.clear()
+        self.payloads.clear()
+        self.hits = 0
+        self.misses = 0
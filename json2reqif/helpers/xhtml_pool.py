@@ -0,0 +1,105 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, List, Tuple
+
+from json2reqif.helpers.records import ValueTable
+from json2reqif.helpers.xhtml import XhtmlCache, convertXhtml
+
+
+def _convertBatch(values: List[str]) -> List[str]:
+    """Worker side of the pool, payloads are already lifted by the parent"""
+    return [convertXhtml(val) for val in values]
+
+
+class XhtmlPool:
+    '''
+    Converts XHTML attribute values in worker processes
+
+    Value table entries are reserved empty during traversal and queued, values are sent to workers in batches
+    as soon as a batch fills up and are assigned back to the same entries, so attribute order and output stay
+    identical to the serial run. Cache is consulted in the parent, identical values in flight
+    are converted once, payloads are lifted in the parent as they must stay in its payload store.
+    '''
+    def __init__(self, jobs: int, cache: XhtmlCache, batch_size: int = 256, batch_chars: int = 1 << 20):
+        self.jobs = jobs
+        self.cache = cache
+        self.batch_size = batch_size
+        self.batch_chars = batch_chars
+        self.executor: ProcessPoolExecutor | None = None
+
+        # Current batch as cache keys and lifted values, table entries waiting for each key
+        self._keys: List[bytes | int] = []
+        self._values: List[str] = []
+        self._chars = 0
+        self._waiting: Dict[bytes | int, List[Tuple[ValueTable, int]]] = {}
+        self._futures: Deque[Tuple[List[bytes | int], Future]] = deque()
+        self._sequence = 0
+        self.batches = 0
+
+    def __enter__(self) -> "XhtmlPool":
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.finish()
+        finally:
+            self.executor.shutdown(cancel_futures=exc_type is not None)
+            self.executor = None
+
+    def defer(self, table: ValueTable, index: int, val: str) -> None:
+        """Queues conversion of the value, table entry is set when the batch completes"""
+        if self.cache.size > 0:
+            key = self.cache.key(val)
+            converted = self.cache.get(key)
+            if converted is not None:
+                self.cache.hits += 1
+                table.values[index] = converted
+                return
+
+            waiting = self._waiting.get(key)
+            if waiting is not None:
+                self.cache.hits += 1
+                waiting.append((table, index))
+                return
+        else:
+            key = self._sequence
+            self._sequence += 1
+
+        self.cache.misses += 1
+        self._waiting[key] = [(table, index)]
+        self._keys.append(key)
+        self._values.append(self.cache.payloads.lift(val))
+        self._chars += len(self._values[-1])
+
+        if len(self._keys) >= self.batch_size or self._chars >= self.batch_chars:
+            self._submit()
+
+    def finish(self) -> None:
+        """Waits for every queued value"""
+        self._submit()
+        while self._futures:
+            self._collect()
+
+    def _submit(self) -> None:
+        if not self._keys:
+            return
+
+        self._futures.append((self._keys, self.executor.submit(_convertBatch, self._values)))
+        self.batches += 1
+        self._keys = []
+        self._values = []
+        self._chars = 0
+
+        # Keep results from piling up, completed batches are assigned in submission order
+        while self._futures and (self._futures[0][1].done() or len(self._futures) > 2 * self.jobs):
+            self._collect()
+
+    def _collect(self) -> None:
+        keys, future = self._futures.popleft()
+        for key, converted in zip(keys, future.result()):
+            for table, index in self._waiting.pop(key):
+                table.values[index] = converted
+            if isinstance(key, bytes):
+                self.cache.put(key, converted)
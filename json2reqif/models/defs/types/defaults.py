@@ -1,12 +1,13 @@
 # generated by datamodel-codegen:
 #   filename:  defs/types/defaults.json
-#   timestamp: 2025-12-11T15:53:13+00:00
+#   timestamp: 2026-10-16T22:49:24+00:00
 
 from __future__ import annotations
 
+from enum import Enum
 from typing import Any, Optional
 
-from pydantic import BaseModel, Field, RootModel
+from pydantic import BaseModel, ConfigDict, Field, RootModel
 
 
 class ReqifAttributeTypeDefinitions(RootModel[Any]):
@@ -23,18 +24,52 @@ class Selector(RootModel[str]):
     """
 
 
-class Config(BaseModel):
-    tool: str
+class Dispatch(BaseModel):
     """
-    Tool name to reflect in the specification
+    Discriminator routing each node to the variant with a single lookup instead of evaluating the match filter
     """
-    toolVersion: str
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    selector: str
     """
-    Tool version to reflect in the specification
+    Plain JSONPath pointer to the discriminating field of the node, like $.Type or $.children
     """
-    repository: str
+    equals: Optional[str] = None
     """
-    Repository identifier to match requirement groups against each other
+    Variant is chosen when the field equals this value
+    """
+    nonEmpty: Optional[bool] = None
+    """
+    Variant is chosen when the field length is non-zero (true) or zero (false)
+    """
+
+
+class Mode(Enum):
+    """
+    random (default) or stable, stable identifiers are hashes of the node key and do not change between runs
+    """
+
+    random = 'random'
+    stable = 'stable'
+
+
+class Identifiers(BaseModel):
+    """
+    Identifier generation, random identifiers change on every run, stable ones are derived from the content
+    """
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    mode: Optional[Mode] = None
+    """
+    random (default) or stable, stable identifiers are hashes of the node key and do not change between runs
+    """
+    selector: Optional[str] = None
+    """
+    JSONPath selector of the requirement key, e.g. UID, key is prefixed by variant type. Without selector or value the key is the position of the node within its parent
     """
 
 
@@ -59,3 +94,19 @@ class FieldDefaultAttrs(BaseModel):
     """
     Datatype Name to be used in specification as {attributeType_type}
     """
+
+
+class Config(BaseModel):
+    tool: str
+    """
+    Tool name to reflect in the specification
+    """
+    toolVersion: str
+    """
+    Tool version to reflect in the specification
+    """
+    repository: str
+    """
+    Repository identifier to match requirement groups against each other
+    """
+    identifiers: Optional[Identifiers] = None
@@ -4,6 +4,7 @@
 
 from __future__ import annotations
 
+from enum import Enum
 from typing import Any, Literal, Optional, Union
 
 from pydantic import BaseModel, ConfigDict, Field, RootModel, conint
@@ -83,6 +84,17 @@ class EnumerationAttributeValue(BaseModel):
     content: str
 
 
+class OnUnknown(Enum):
+    """
+    Handling of values missing from the enumeration: error (default) fails the conversion, skip leaves the attribute out, default uses defaultValue, extend adds the value to the enumeration
+    """
+
+    error = 'error'
+    skip = 'skip'
+    default = 'default'
+    extend = 'extend'
+
+
 class EnumerationAttribute(BaseModel):
     """
     AttributeDefinitionEnumeration / AttributeValueEnumeration - for predefined choices
@@ -93,6 +105,14 @@ class EnumerationAttribute(BaseModel):
     Attribute type in the specifications
     """
     values: list[EnumerationAttributeValue] = Field(..., min_length=1)
+    onUnknown: Optional[OnUnknown] = None
+    """
+    Handling of values missing from the enumeration: error (default) fails the conversion, skip leaves the attribute out, default uses defaultValue, extend adds the value to the enumeration
+    """
+    defaultValue: Optional[str] = None
+    """
+    Value used for unknown values with onUnknown default, must be one of the values
+    """
     selector: str
     """
     JSONPath pointer to the element from the parent node
@@ -1,6 +1,6 @@
 # generated by datamodel-codegen:
 #   filename:  mapping.json
-#   timestamp: 2025-12-11T15:53:13+00:00
+#   timestamp: 2026-10-16T22:49:24+00:00
 
 from __future__ import annotations
 
@@ -31,6 +31,7 @@ class Variant(BaseModel):
     attributes: requirement.Requirement
     children: Optional[defaults.Selector] = None
     match: defaults.Selector
+    dispatch: Optional[defaults.Dispatch] = None
     type: constr(min_length=1, max_length=100)
 
 
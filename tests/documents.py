@@ -0,0 +1,25 @@
+"""Synthetic input documents of the tests"""
+
+import base64
+import zipfile
+
+
+def image(seed: int) -> str:
+    """Rich text with png data URI long enough to be kept aside as payload"""
+    payload = base64.b64encode(bytes((seed + i) % 256 for i in range(600))).decode("ascii")
+    return f'<p><img alt="Image {seed}" src="data:image/png;base64,{payload}"/></p>'
+
+def document(name: str, contents) -> dict:
+    """Specification with one folder holding a requirement per rich text content"""
+    children = [
+        {"SectionNumber": str(i), "Caption": f"{name} {i}", "Content": content, "UID": f"{name}-{i}", "Id": str(i), "children": []}
+        for i, content in enumerate(contents, 1)
+    ]
+    return {"Caption": name, "UID": f"SPEC-{name}", "Id": "0", "children": [
+        {"SectionNumber": "1", "Caption": "Folder", "Content": "", "UID": f"{name}-F", "Id": "100", "children": children},
+    ]}
+
+def members(path) -> set:
+    """Image members of .reqifz archive"""
+    with zipfile.ZipFile(path) as archive:
+        return {name for name in archive.namelist() if name.startswith("files/")}
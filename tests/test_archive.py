@@ -0,0 +1,22 @@
+import zipfile
+
+from json2reqif import convert, loadMapping
+from json2reqif.helpers.xhtml import XhtmlCache
+
+from tests.documents import document, image, members
+
+
+def test_shared_cache_archive_holds_referenced_images(tmp_path):
+    plan = loadMapping("sample/mapping_capella.json")
+    cache = XhtmlCache()
+
+    convert(document("a", [image(1)]), plan, str(tmp_path / "a.reqifz"), xhtml_cache=cache)
+    convert(document("b", [image(2), "<p>no image</p>"]), plan, str(tmp_path / "b.reqifz"), xhtml_cache=cache)
+
+    # Store shared by both conversions holds both payloads, second archive only the one its values use
+    assert len(cache.payloads) == 2
+    a, b = members(tmp_path / "a.reqifz"), members(tmp_path / "b.reqifz")
+    assert len(a) == len(b) == 1 and a != b
+
+    with zipfile.ZipFile(tmp_path / "b.reqifz") as archive:
+        assert f'data="{next(iter(b))}"' in archive.read("b.reqif").decode("utf-8")
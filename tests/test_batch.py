@@ -0,0 +1,31 @@
+import json
+import zipfile
+
+import pytest
+
+from json2reqif import loadMapping
+from json2reqif.batch import collectInputs, convertFiles
+
+from tests.documents import document, image, members
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_archives_hold_images_of_their_own_file(tmp_path, stream):
+    shared = image(7)
+    for name, contents in (("a", [image(1), shared]), ("b", [image(2), shared])):
+        (tmp_path / f"{name}.json").write_text(json.dumps(document(name, contents)), encoding="utf-8")
+
+    pairs = collectInputs([str(tmp_path)], extension=".reqifz")
+    results = list(convertFiles(pairs, loadMapping("sample/mapping_capella.json"), stream=stream))
+    assert all(result.ok for result in results), [result.error for result in results]
+
+    a, b = members(tmp_path / "a.reqifz"), members(tmp_path / "b.reqifz")
+    assert len(a) == len(b) == 2
+    assert len(a & b) == 1, "only the image used by both files is in both archives"
+
+    # Every image member is referenced by the document of its archive
+    for name, files in (("a", a), ("b", b)):
+        with zipfile.ZipFile(tmp_path / f"{name}.reqifz") as archive:
+            xml = archive.read(f"{name}.reqif").decode("utf-8")
+        assert all(f'data="{path}"' in xml for path in files)
+        assert "base64," not in xml
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from json2reqif import loadMapping
+from json2reqif.converter import ReqIFConverterLib
+from json2reqif.helpers.reqif_writer import ReqIFStreamWriter
+
+from benchmarks.deep import deepDocument
+
+DEPTH = 10000
+
+
+class HierarchyCounter:
+    '''Output discarding the written xml, counts opened and closed SPEC-HIERARCHY entries'''
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+
+    def write(self, text: str) -> None:
+        self.opened += text.count("<SPEC-HIERARCHY ")
+        self.closed += text.count("</SPEC-HIERARCHY>")
+
+    def tell(self) -> int:
+        raise OSError
+
+
+def deepJson(depth: int) -> str:
+    """Json text of deepDocument, built without recursion of the json encoder"""
+    parts = ['{"Caption": "Deep Specification", "UID": "SPEC-0", "Id": "0", "children": [']
+    for i in range(1, depth + 1):
+        fields = {"SectionNumber": str(i), "Caption": f"Level {i}", "Content": f"<p>Level {i}</p>", "UID": f"REQ-{i}", "Id": str(i)}
+        parts.append(json.dumps(fields)[:-1] + ', "children": [')
+    parts.append("]}" * (depth + 1))
+    return "".join(parts)
+
+def checkChains(hierarchy, chains: int, depth: int) -> None:
+    """Every top level entry starts a chain of single children with levels numbered from 1"""
+    assert len(hierarchy) == chains
+    for top in hierarchy:
+        entries, level = [top], 0
+        while entries:
+            assert len(entries) == 1 and entries[0].level == level + 1, f"Broken level at {level + 1}"
+            entries, level = entries[0].children, level + 1
+        assert level == depth
+
+def checkOutput(converter: ReqIFConverterLib, chains: int, depth: int) -> None:
+    """Bundle is assembled and written down to the deepest entry"""
+    bundle = converter.createBundle()
+    checkChains(converter.hierarchy_data, chains, depth)
+
+    output = HierarchyCounter()
+    ReqIFStreamWriter(output).write(bundle)
+    assert output.opened == output.closed == chains * depth
+
+@pytest.fixture(scope="module")
+def plan():
+    return loadMapping("sample/mapping_capella.json")
+
+def test_tree(plan):
+    checkOutput(ReqIFConverterLib(deepDocument(DEPTH), plan), 1, DEPTH)
+
+def test_stream(plan, tmp_path):
+    path = tmp_path / "deep.json"
+    path.write_text(deepJson(DEPTH), encoding="utf-8")
+    with open(path, "rb") as source:
+        checkOutput(ReqIFConverterLib(None, plan, stream=source), 1, DEPTH)
+
+def test_shard(plan):
+    # Sharding needs several top level subtrees, each of them is a whole chain sent to a worker
+    document = deepDocument(DEPTH)
+    document["children"].extend(deepDocument(DEPTH)["children"])
+    checkOutput(ReqIFConverterLib(document, plan, jobs=2, shard=True), 2, DEPTH)
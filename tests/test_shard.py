@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from json2reqif import convert, loadMapping
+
+
+def stableMapping(tmp_path) -> str:
+    """Sample mapping with identifiers hashed from the UID of the node"""
+    with open("sample/mapping_capella.json", "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    mapping["config"]["identifiers"] = {"mode": "stable", "selector": "$.UID"}
+    path = tmp_path / "mapping.json"
+    path.write_text(json.dumps(mapping), encoding="utf-8")
+    return str(path)
+
+def folders(*uids) -> dict:
+    """Specification of top level folders, each holding a requirement of the given UID"""
+    return {"Caption": "Shards", "UID": "SPEC-0", "Id": "0", "children": [
+        {"SectionNumber": str(i), "Caption": f"Folder {i}", "Content": "", "UID": f"F-{i}", "Id": str(i), "children": [
+            {"SectionNumber": f"{i}.1", "Caption": uid, "Content": f"<p>{uid}</p>", "UID": uid, "Id": f"{i}1", "children": []},
+        ]}
+        for i, uid in enumerate(uids, 1)
+    ]}
+
+def test_sharded_conversion_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    plan = loadMapping(stableMapping(tmp_path))
+    document = folders("R-1", "R-2", "R-3")
+    assert convert(document, plan, jobs=2, shard=True) == convert(document, plan)
+
+@pytest.mark.parametrize("options", [{}, {"jobs": 2, "shard": True}])
+def test_duplicate_key_across_subtrees_is_reported_with_key(tmp_path, options):
+    plan = loadMapping(stableMapping(tmp_path))
+    with pytest.raises(Exception, match="Duplicate identifier OBJ_.* for key `Requirement:R-1`"):
+        convert(folders("R-1", "R-1"), plan, **options)